@@ -10,6 +10,12 @@
 from charm.toolbox.pairinggroup import PairingGroup, ZR, G1, G2, GT, pair
 from charm.toolbox.ABEnc import ABEnc
 from msp import MSP
+from attr_registry import AttributeRegistry
+import fixed_base
+from multiexp import multiexp
+from multipairing import group_pair, pair_prod
+from coupon_pool import CouponPools
+from transcript import Transcript, FS_LEGACY, check_version
 
 debug = False
 
@@ -19,6 +25,9 @@ class FABS_KPABS(ABEnc):
         self.name = "Our KP-ABS"
         self.group = group_obj
         self.util = MSP(self.group, verbose)
+        self.registry = AttributeRegistry(self.group)
+        self.pair = group_pair(self.group)
+        self.pools = CouponPools()
 
     def setup(self, n):
         # pick random elements from the two source groups
@@ -28,18 +37,48 @@ class FABS_KPABS(ABEnc):
         alpha = self.group.random(ZR)    
         
         # Compute the master public key 
-        e_g1g2_alpha = pair(g1, g2) ** alpha
+        e_g1g2_alpha = self.pair(g1, g2) ** alpha
       
         msk = {'alpha': alpha}
         mpk = {'g1': g1, 'g2': g2, 'e_g1g2_alpha': e_g1g2_alpha}
         
         return mpk, msk
 
+    def precompute(self, mpk):
+        # Build fixed-base tables for g1, g2 and e(g1, g2)^alpha; later exponentiations use them automatically
+        return fixed_base.precompute(mpk, ['g1', 'g2', 'e_g1g2_alpha'])
+
+    def coupon(self, mpk, sk):
+        # Randomness of one signature and every value that depends only on it and the key
+        k, t = self.group.random(ZR), self.group.random(ZR)
+        r_alpha, r_k = self.group.random(ZR), self.group.random(ZR)
+        return {'k': k, 't': t, 'r_alpha': r_alpha, 'r_k': r_k,
+                'B1': mpk['g1'] ** k, 'C': sk['sk_1'] ** t, 'W1': mpk['g1'] ** r_k,
+                'Y': mpk['e_g1g2_alpha'] ** (k * t), 'Z': mpk['e_g1g2_alpha'] ** r_alpha}
+
+    def offline(self, mpk, sk, count=None, max_size=None):
+        """
+        Offline phase: fill the coupon pool of sk with up to count coupons (by default until the pool is full).
+        Later sign calls with sk take their randomness from this pool. Pools are kept for a bounded number
+        of keys (see CouponPools); call self.pools.discard(sk) once sk is no longer used.
+        """
+
+        pool = self.pools.get_or_create(sk, lambda: self.coupon(mpk, sk), max_size)
+        return pool.fill(count)
+
+    def challenge(self, A, B, C, Y, Z, W, msg, fs_version=FS_LEGACY):
+        # Fiat-Shamir challenge of the Schnorr proof, in the legacy string form or as a byte transcript
+        if fs_version == FS_LEGACY:
+            return self.group.hash(str(A) + str(B) + str(C) + str(Y) + str(Z) + str(W) + str(msg), ZR)
+        check_version(fs_version)
+        transcript = Transcript(self.group, 'FABS-KP-ABS', fs_version)
+        for label, value in (('A', A), ('B', B), ('C', C), ('Y', Y), ('Z', Z), ('W', W), ('msg', msg)):
+            transcript.absorb(label, value)
+        return transcript.challenge()
+
     def keygen(self, mpk, msk, policy_str):
         # Convert the policy into MSP
-        policy = self.util.createPolicy(policy_str)
-        mono_span_prog = self.util.convert_policy_to_msp(policy)
-        num_cols = self.util.len_longest_row
+        policy, mono_span_prog, num_cols = self.util.compile_policy(policy_str, sparse=True)
 
         # Pick randomness in secret key
         r = self.group.random(ZR)
@@ -54,67 +93,76 @@ class FABS_KPABS(ABEnc):
         sk_1 = mpk['g2'] ** r
             
         sk_2 = {}
-        for attr, row in mono_span_prog.items():
-            attr_stripped = self.util.strip_index(attr)
-            attrHash = self.group.hash(attr_stripped, G1)
-            len_row = len(row)
-            Mivtop = sum(i[0] * i[1] for i in zip(row, v[:len_row]))
+        shares = mono_span_prog.matrix.shares(v)
+        for attr in mono_span_prog.keys():
+            attr_stripped = self.registry.strip_index(attr)
+            attrHash = self.registry.hash_g1(attr_stripped)
+            Mivtop = shares[attr]
             sk_2[attr] = mpk['g1'] ** Mivtop * attrHash ** r
                           
         sk = {'policy_str': policy_str, 'sk_1': sk_1, 'sk_2': sk_2}
                 
         return sk
 
-    def sign(self, mpk, sk, msg, policy_str, attr_list):
+    def sign(self, mpk, sk, msg, policy_str, attr_list, fs_version=FS_LEGACY):
         # Convert the policy into MSP
-        policy = self.util.createPolicy(policy_str)
-        mono_span_prog = self.util.convert_policy_to_msp(policy)
-        num_cols = self.util.len_longest_row
+        policy, mono_span_prog, num_cols = self.util.compile_policy(policy_str)
+
+        # Satisfying rows, picked before a coupon is spent
+        nodes = self.util.prune_min_cost(policy, attr_list)
+        if not nodes:
+            raise ValueError("the signer's attributes do not satisfy the policy %r" % policy_str)
        
-        # pick randomness
-        k, t = self.group.random(ZR), self.group.random(ZR)
+        # pick randomness, from the coupon pool of sk when the offline phase has filled one
+        pool = self.pools.get(sk)
+        coupon = pool.take() if pool is not None else self.coupon(mpk, sk)
+        k, t = coupon['k'], coupon['t']
 	
         # Generate signature components A, B, C   
-        nodes = self.util.prune(policy, attr_list)
-        if not nodes:
-            print ("Policy not satisfied.")
+        # Rows below threshold gates enter with their reconstruction coefficient omega, all others with 1
+        omega = self.util.reconstruction_coefficients(policy, nodes)
         
         A = 1       
-        B1 = mpk['g1'] ** k    
-        B2 = 1  
-          
-        # Generate the Schnorr signature components for zero-knowledge proof
-        r_alpha, r_k = self.group.random(ZR), self.group.random(ZR)         
-        r_i = {}        
-        W = mpk['g1'] ** r_k  
+        B1 = coupon['B1']
         
-        stripped_nodes = []
+        # The verifier checks the proof over every attribute of attr_list, so H(attr) enters B with the sum
+        # of the coefficients of the rows of attr used to sign, which is 0 for the attributes left unused
+        exponents = dict.fromkeys(attr_list, 0)
         for node in nodes:
             attr = node.getAttributeAndIndex()
-            attr_stripped = self.util.strip_index(attr) 
-            stripped_nodes.append(attr_stripped)
-            A *= sk['sk_2'][attr_stripped]
-            attr_hash = self.group.hash(attr_stripped, G1)
-            B2 *= attr_hash
-            
+            attr_stripped = self.registry.strip_index(attr)
+            if attr in omega:
+                A *= sk['sk_2'][attr] ** omega[attr]
+                exponents[attr_stripped] += omega[attr]
+            else:
+                A *= sk['sk_2'][attr]
+                exponents[attr_stripped] += 1
+          
+        # Generate the Schnorr signature components for zero-knowledge proof
+        r_alpha, r_k = coupon['r_alpha'], coupon['r_k']
+        r_i = {}        
+        hashes, W_exps = [], []
+        for attr in exponents:
             r = self.group.random(ZR)
             r_i[attr] = r              
-            W *= attr_hash ** r
+            hashes.append(self.registry.hash_g1(attr))
+            W_exps.append(r)
             
+        W = coupon['W1'] * multiexp(hashes, W_exps)
         A = A ** (k * t)   
-        B = B1 * B2 ** k    
+        B = B1 * multiexp(hashes, list(exponents.values())) ** k    
                  
-        C = sk['sk_1'] ** t        
+        C = coupon['C']
                       
-        Y = mpk['e_g1g2_alpha'] ** (k * t)
-        Z = mpk['e_g1g2_alpha'] ** r_alpha
+        Y = coupon['Y']
+        Z = coupon['Z']
                                
-        c = self.group.hash(str(A) + str(B) + str(C) + str(Y) + str(Z) + str(W) + str(msg), ZR)
+        c = self.challenge(A, B, C, Y, Z, W, msg, fs_version)
         s_alpha = r_alpha - k * t * c
         s_i = {}
         
         for r_attr, r_value in r_i.items():
-            s_i[r_attr] = r_value - k * c
+            s_i[r_attr] = r_value - exponents[r_attr] * k * c
 	
         s_k = r_k - k * c
         
@@ -122,22 +170,39 @@ class FABS_KPABS(ABEnc):
             
         return signature
                 
-    def verify(self, mpk, signature, attr_list, msg):       
+    def verify(self, mpk, signature, attr_list, msg, fs_version=FS_LEGACY):       
         # Recompute Y, Z, W, and verify Schnorr signature
-        Y = pair(signature['A'], mpk['g2']) / (pair(signature['B'], signature['C']))
+        Y = pair_prod(self.group, [signature['A'], signature['B'] ** -1], [mpk['g2'], signature['C']])
         Z = mpk['e_g1g2_alpha'] ** (signature['s_alpha']) * Y ** signature['c']
         
-        W = mpk['g1'] ** signature['s_k']      
+        W_bases, W_exps = [mpk['g1']], [signature['s_k']]
         for attr in attr_list:
-            attrHash = self.group.hash(attr, G1)
-            W *= attrHash ** signature['s_i'][attr] 
+            W_bases.append(self.registry.hash_g1(attr))
+            W_exps.append(signature['s_i'][attr])
             
-        W *= signature['B'] ** signature['c']
+        W_bases.append(signature['B'])
+        W_exps.append(signature['c'])
+        W = multiexp(W_bases, W_exps)
           
-        if signature['c'] == self.group.hash(str(signature['A']) + str(signature['B']) + str(signature['C']) + str(Y) + str(Z) + str(W) + str(msg), ZR):
+        if signature['c'] == self.challenge(signature['A'], signature['B'], signature['C'], Y, Z, W, msg, fs_version):
             return True
         else:
             return False
 
-   
+    def verify_batch(self, mpk, items, fs_version=FS_LEGACY):
+        """
+        Verify a list of (signature, attr_list, msg) triples and return one result per triple, in order.
+        This is a convenience wrapper around verify, not a batch verifier: a signature carries the
+        challenge c rather than its commitments, so its pairing check cannot be merged with those of
+        other signatures. Only the attribute hashes are shared, through the registry cache.
+        A triple whose signature is malformed (a missing entry, or a value of the wrong type) gets
+        the result False; any other error is raised.
+        """
 
+        results = []
+        for signature, attr_list, msg in items:
+            try:
+                results.append(self.verify(mpk, signature, attr_list, msg, fs_version))
+            except (KeyError, TypeError, ValueError):
+                results.append(False)
+        return results
@@ -10,6 +10,12 @@
 from charm.toolbox.pairinggroup import PairingGroup, ZR, G1, G2, GT, pair
 from charm.toolbox.ABEnc import ABEnc
 from msp import MSP
+from attr_registry import AttributeRegistry
+import fixed_base
+from multiexp import multiexp
+from multipairing import group_pair, pair_prod
+from coupon_pool import CouponPools
+from transcript import Transcript, FS_LEGACY, check_version
 
 debug = False
 
@@ -19,8 +25,15 @@ class FABS_SPABS(ABEnc):
         self.name = "Our SP-ABS"
         self.group = group_obj
         self.util = MSP(self.group, verbose)
+        self.registry = AttributeRegistry(self.group)
+        self.pair = group_pair(self.group)
+        self.pools = CouponPools()
+
+    def setup(self, attr_universe=None):
+        # Hash the known attribute universe ahead of time
+        if attr_universe is not None:
+            self.registry.prewarm(attr_universe)
 
-    def setup(self):
         # pick random elements from the two source groups
         g1, g2, g3 = self.group.random(G1), self.group.random(G2), self.group.random(G1)
                 
@@ -28,13 +41,56 @@ class FABS_SPABS(ABEnc):
         alpha = self.group.random(ZR)    
         
         # Compute the master public key 
-        e_g1g2_alpha = pair(g1, g2) ** alpha
+        e_g1g2_alpha = self.pair(g1, g2) ** alpha
       
         msk = {'alpha': alpha}
         mpk = {'g1': g1, 'g2': g2, 'g3': g3, 'e_g1g2_alpha': e_g1g2_alpha}
         
         return mpk, msk
 
+    def precompute(self, mpk):
+        # Build fixed-base tables for g1, g2, g3 and e(g1, g2)^alpha; later exponentiations use them automatically
+        return fixed_base.precompute(mpk, ['g1', 'g2', 'g3', 'e_g1g2_alpha'])
+
+    def coupon(self, mpk, sk):
+        # Randomness of one signature and every value that depends only on it and the key.
+        # ka and ra stand for a[0] * k and a[0] * r_alpha: both are uniform whatever the policy,
+        # so they can be drawn before a[0] is known and the GT exponentiations moved offline.
+        ka, t, ra = self.group.random(ZR), self.group.random(ZR), self.group.random(ZR)
+        return {'ka': ka, 't': t, 'ra': ra,
+                'A1': sk['sk_1'] ** (ka * t), 'B1': mpk['g3'] ** ka, 'C': sk['sk_3'] ** t,
+                'Y': mpk['e_g1g2_alpha'] ** (ka * t), 'Z': mpk['e_g1g2_alpha'] ** ra}
+
+    def offline(self, mpk, sk, count=None, max_size=None):
+        """
+        Offline phase: fill the coupon pool of sk with up to count coupons (by default until the pool is full).
+        Later sign calls with sk take their randomness from this pool. Pools are kept for a bounded number
+        of keys (see CouponPools); call self.pools.discard(sk) once sk is no longer used.
+        """
+
+        pool = self.pools.get_or_create(sk, lambda: self.coupon(mpk, sk), max_size)
+        return pool.fill(count)
+
+    def challenge(self, A, B, C, Y, Z, W, msg, fs_version=FS_LEGACY):
+        # Fiat-Shamir challenge of the Schnorr proof, in the legacy string form or as a byte transcript
+        if fs_version == FS_LEGACY:
+            return self.group.hash(str(A) + str(B) + str(C) + str(Y) + str(Z) + str(W) + str(msg), ZR)
+        check_version(fs_version)
+        transcript = Transcript(self.group, 'FABS-SP-ABS', fs_version)
+        for label, value in (('A', A), ('B', B), ('C', C), ('Y', Y), ('Z', Z), ('W', W), ('msg', msg)):
+            transcript.absorb(label, value)
+        return transcript.challenge()
+
+    def policy_vector(self, mono_span_prog, num_cols, fs_version=FS_LEGACY):
+        # Public secret sharing vector a, derived from the commitment of the policy matrix
+        if fs_version == FS_LEGACY:
+            h_m = self.group.hash(str(mono_span_prog.dense), ZR)
+            return [self.group.hash(str(i) + str(h_m), ZR) for i in range(num_cols - 1)]
+        check_version(fs_version)
+        transcript = Transcript(self.group, 'FABS-SP-ABS/policy', fs_version)
+        transcript.absorb('msp', mono_span_prog.dense)
+        return [transcript.challenge('a/%d' % i) for i in range(num_cols - 1)]
+
     def keygen(self, mpk, msk, attr_list):
         # Pick randomness in secret key
         r = self.group.random(ZR)
@@ -44,7 +100,7 @@ class FABS_SPABS(ABEnc):
             
         sk_2 = {}
         for attr in attr_list:
-            attrHash = self.group.hash(attr, G1)
+            attrHash = self.registry.hash_g1(attr)
             sk_2[attr] = attrHash ** r
         
         sk_3 = mpk['g2'] ** r     
@@ -53,72 +109,84 @@ class FABS_SPABS(ABEnc):
                 
         return sk
 
-    def sign(self, mpk, sk, msg, policy_str, attr_list):
+    def sign(self, mpk, sk, msg, policy_str, attr_list, fs_version=FS_LEGACY):
         # Convert the policy into MSP
-        policy = self.util.createPolicy(policy_str)
-        mono_span_prog = self.util.convert_policy_to_msp(policy)
-        num_cols = self.util.len_longest_row
+        policy, mono_span_prog, num_cols = self.util.compile_policy(policy_str, sparse=True)
 
-        # Compute the commitment of the policy matrix
-        h_m = self.group.hash(str(mono_span_prog), ZR)
-        
-        # Create the public secret sharing vector a
-        a = []
-        for i in range(num_cols - 1):
-            a.append(self.group.hash(str(i) + str(h_m), ZR))
+        # Create the public secret sharing vector a from the commitment of the policy matrix
+        a = self.policy_vector(mono_span_prog, num_cols, fs_version)
+
+        # Satisfying rows, picked before a coupon is spent
+        nodes = self.util.prune_min_cost(policy, attr_list)
+        if not nodes:
+            raise ValueError("the signer's attributes do not satisfy the policy %r" % policy_str)
 
-        # pick randomness
-        k, t = self.group.random(ZR), self.group.random(ZR)
+        # pick randomness, from the coupon pool of sk when the offline phase has filled one
+        pool = self.pools.get(sk)
+        coupon = pool.take() if pool is not None else self.coupon(mpk, sk)
+        a0_inv = 1 / a[0]
+        k, t = coupon['ka'] * a0_inv, coupon['t']
 	
         # Generate signature components A, B, C   
-        nodes = self.util.prune(policy, attr_list)
-        if not nodes:
-            print ("Policy not satisfied.")
+        # Rows below threshold gates enter with their reconstruction coefficient omega, all others with 1
+        omega = self.util.reconstruction_coefficients(policy, nodes)
         
-        A1 = sk['sk_1'] ** (a[0] * k * t)
-        B1 = mpk['g3'] ** (a[0] * k)
+        A1 = coupon['A1']
+        B1 = coupon['B1']
         
         A2, B2 = 1, 1
         
         stripped_nodes = []
         for node in nodes:
             attr = node.getAttributeAndIndex()
-            attr_stripped = self.util.strip_index(attr) 
+            attr_stripped = self.registry.strip_index(attr)
             stripped_nodes.append(attr_stripped)
-            A2 *= sk['sk_2'][attr_stripped]
-            B2 *= self.group.hash(attr_stripped, G1)
+            if attr in omega:
+                A2 *= sk['sk_2'][attr_stripped] ** omega[attr]
+                B2 *= self.registry.hash_g1(attr_stripped) ** omega[attr]
+            else:
+                A2 *= sk['sk_2'][attr_stripped]
+                B2 *= self.registry.hash_g1(attr_stripped)
         
                
         A = A1 * (A2 ** (k * t))        
         B = B1 * (B2 ** k)
         
-        C = sk['sk_3'] ** t        
+        C = coupon['C']
         
         # Generate the Schnorr signature components for zero-knowledge proof
-        r_alpha = self.group.random(ZR)        
+        r_alpha = coupon['ra'] * a0_inv
         r_i = {}
         
         
-        Y = mpk['e_g1g2_alpha'] ** (a[0] * k * t)
-        Z = mpk['e_g1g2_alpha'] ** (a[0] * r_alpha)
+        Y = coupon['Y']
+        Z = coupon['Z']
         
-        W = 1       
-        for attr, row in mono_span_prog.items():
-            attr_stripped = self.util.strip_index(attr)
-            attrHash = self.group.hash(attr_stripped, G1)
-            len_row = len(row)
-            Mivtop = sum(i[0] * i[1] for i in zip(row, a[:len_row]))
+        # W = prod (g3^(M_i a) * H(attr_i))^(r_i), with the g3 terms gathered into one exponent
+        g3_exp = 0
+        W_bases, W_exps = [], []
+        shares = mono_span_prog.matrix.shares(a)
+        for attr in mono_span_prog.keys():
+            attr_stripped = self.registry.strip_index(attr)
+            attrHash = self.registry.hash_g1(attr_stripped)
+            Mivtop = shares[attr]
             
             r = self.group.random(ZR)
             r_i[attr] = r           
-            W *= (mpk['g3'] ** Mivtop * attrHash) ** r
+            g3_exp += Mivtop * r
+            W_bases.append(attrHash)
+            W_exps.append(r)
+
+        W = multiexp([mpk['g3']] + W_bases, [g3_exp] + W_exps)
                    
-        c = self.group.hash(str(A) + str(B) + str(C) + str(Y) + str(Z) + str(W) + str(msg), ZR)
+        c = self.challenge(A, B, C, Y, Z, W, msg, fs_version)
         s_alpha = r_alpha - k * t * c
         s_i = {}
         
         for r_attr, r_value in r_i.items():
-            if r_attr in stripped_nodes:
+            if r_attr in omega:
+                s_i[r_attr] = r_value - omega[r_attr] * k * c
+            elif r_attr in stripped_nodes:
                 s_i[r_attr] = r_value - k * c
             else:
                 s_i[r_attr] = r_value
@@ -128,37 +196,74 @@ class FABS_SPABS(ABEnc):
         return signature
         
         
-    def verify(self, mpk, signature, policy_str, msg):    
+    def verify(self, mpk, signature, policy_str, msg, fs_version=FS_LEGACY):    
         # Convert the policy into MSP
-        policy = self.util.createPolicy(policy_str)
-        mono_span_prog = self.util.convert_policy_to_msp(policy)
-        num_cols = self.util.len_longest_row    
+        policy, mono_span_prog, num_cols = self.util.compile_policy(policy_str, sparse=True)
 
-        h_m = self.group.hash(str(mono_span_prog), ZR)
-
-        a = []
-        for i in range(num_cols - 1):
-            a.append(self.group.hash(str(i) + str(h_m), ZR))
+        a = self.policy_vector(mono_span_prog, num_cols, fs_version)
     
-        # Recompute Y, Z, W, and verify Schnorr signature
-        Y = pair(signature['A'], mpk['g2']) / (pair(signature['B'], signature['C']))
-        Z = mpk['e_g1g2_alpha'] ** (a[0] * signature['s_alpha']) * Y ** signature['c']
-
-        W = 1       
-        for attr, row in mono_span_prog.items():
-            attr_stripped = self.util.strip_index(attr)
-            attrHash = self.group.hash(attr_stripped, G1)
-            len_row = len(row)
-            Mivtop = sum(i[0] * i[1] for i in zip(row, a[:len_row]))
+        g3_exp = 0
+        W_bases, W_exps = [], []
+        shares = mono_span_prog.matrix.shares(a)
+        for attr in mono_span_prog.keys():
+            attr_stripped = self.registry.strip_index(attr)
+            attrHash = self.registry.hash_g1(attr_stripped)
+            Mivtop = shares[attr]
                       
-            W *= (mpk['g3'] ** Mivtop * attrHash) ** signature['s_i'][attr]      
+            s_attr = signature['s_i'][attr]
+            g3_exp += Mivtop * s_attr
+            W_bases.append(attrHash)
+            W_exps.append(s_attr)
         
-        W *= signature['B'] ** signature['c']
-                   
-        if signature['c'] == self.group.hash(str(signature['A']) + str(signature['B']) + str(signature['C']) + str(Y) + str(Z) + str(W) + str(msg), ZR):
-            return True
-        else:
-            return False
+        return self._check(mpk, signature, msg, a[0], [mpk['g3']] + W_bases, [g3_exp] + W_exps, fs_version)
+
+    def _check(self, mpk, signature, msg, a_0, W_bases, W_exps, fs_version):
+        # Recompute Y, Z, W (whose policy terms are W_bases^W_exps), and verify Schnorr signature
+        Y = pair_prod(self.group, [signature['A'], signature['B'] ** -1], [mpk['g2'], signature['C']])
+        Z = mpk['e_g1g2_alpha'] ** (a_0 * signature['s_alpha']) * Y ** signature['c']
+
+        W = multiexp(W_bases + [signature['B']], W_exps + [signature['c']])
+
+        return signature['c'] == self.challenge(signature['A'], signature['B'], signature['C'], Y, Z, W, msg, fs_version)
 
    
 
+
+    def _policy_bases(self, mpk, policy_str, fs_version):
+        # Policy-dependent part of verification: a[0] and g3^(M_i a) * H(attr_i) for every row i
+        policy, mono_span_prog, num_cols = self.util.compile_policy(policy_str, sparse=True)
+
+        a = self.policy_vector(mono_span_prog, num_cols, fs_version)
+
+        bases = {}
+        shares = mono_span_prog.matrix.shares(a)
+        for attr in mono_span_prog.keys():
+            attr_stripped = self.registry.strip_index(attr)
+            attrHash = self.registry.hash_g1(attr_stripped)
+            Mivtop = shares[attr]
+            bases[attr] = mpk['g3'] ** Mivtop * attrHash
+
+        return a[0], bases
+
+    def verify_batch(self, mpk, items, fs_version=FS_LEGACY):
+        """
+        Verify a list of (signature, policy_str, msg) triples and return one result per triple, in order.
+        The MSP, the vector a and the row bases g3^(M_i a) * H(attr_i) are computed once per distinct
+        policy, so W is a single multi-exponentiation over the row bases for every signature.
+        A triple whose signature or policy is malformed (a missing entry, or a value of the wrong type)
+        gets the result False; any other error is raised.
+        """
+
+        policy_bases = {}
+        results = []
+        for signature, policy_str, msg in items:
+            try:
+                if policy_str not in policy_bases:
+                    policy_bases[policy_str] = self._policy_bases(mpk, policy_str, fs_version)
+                a_0, bases = policy_bases[policy_str]
+                W_exps = [signature['s_i'][attr] for attr in bases]
+                results.append(self._check(mpk, signature, msg, a_0, list(bases.values()), W_exps, fs_version))
+            except (KeyError, TypeError, ValueError):
+                results.append(False)
+
+        return results
@@ -7,21 +7,109 @@
 :Date:            08/2025
 '''
 
+from collections import OrderedDict
+import hashlib
+import hmac
+import os
+import threading
+
 from charm.toolbox.pairinggroup import PairingGroup, ZR, G1, G2, GT, pair
 from charm.toolbox.ABEnc import ABEnc
 #from msp import MSP
 from msp_full import MSP
+from attr_registry import AttributeRegistry
+import fixed_base
+from multiexp import multiexp
+from multipairing import group_pair
+from transcript import Transcript, FS_LEGACY, check_version
 
 debug = False
 
+
+class MasterPairings:
+    """
+    The pairings of signing that only depend on the mpk: R = e(k1, g2), and X'_attr = e(k1, X_attr)
+    and Y'_attr = e(k1, Y_attr), computed on first use of every attribute and kept for the most
+    recent max_entries attributes. A GT fixed-base table is large and costs more than a few
+    exponentiations, so R gets one (it is used by every signature) but X'_attr and Y'_attr only once
+    their attribute has been used in table_after signatures; the exponentiations of the
+    knowledge-of-exponent commitments B then use the tables (see multiexp). The tables are built on
+    copies of the cached values, which replace them once built, so other threads never exponentiate
+    an element whose table is under construction.
+    """
+
+    def __init__(self, group_obj, pair, mpk, max_entries=256, table_after=4):
+        assert max_entries > 0, "cache size must be positive"
+        self.pair = pair
+        self.one = group_obj.init(GT, 1)
+        self.k1 = mpk['k1']
+        self.X_attr, self.Y_attr = mpk['X_attr'], mpk['Y_attr']
+        self.max_entries = max_entries
+        self.table_after = table_after
+        self.R = self.pair(self.k1, mpk['g2'])
+        self.R.initPP()
+        # attribute -> [X'_attr, Y'_attr, number of uses]
+        self._attributes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def matches(self, mpk):
+        return self.k1 is mpk['k1'] and self.X_attr is mpk['X_attr'] and self.Y_attr is mpk['Y_attr']
+
+    def attribute(self, attr):
+        """
+        Return (X'_attr, Y'_attr), computing them on first use.
+        """
+
+        with self._lock:
+            entry = self._attributes.get(attr)
+        if entry is None:
+            # Threads computing the same attribute concurrently all end up with the first stored entry
+            pairings = [self.pair(self.k1, self.X_attr[attr]), self.pair(self.k1, self.Y_attr[attr]), 0]
+            with self._lock:
+                entry = self._attributes.setdefault(attr, pairings)
+                while len(self._attributes) > self.max_entries:
+                    self._attributes.popitem(last=False)
+        with self._lock:
+            if attr in self._attributes:
+                self._attributes.move_to_end(attr)
+            entry[2] += 1
+            # Exactly one call sees the count reach table_after, so the tables are built once
+            build_tables = entry[2] == self.table_after
+            X_prime, Y_prime = entry[0], entry[1]
+        if build_tables:
+            X_prime, Y_prime = X_prime * self.one, Y_prime * self.one
+            X_prime.initPP()
+            Y_prime.initPP()
+            with self._lock:
+                entry[0], entry[1] = X_prime, Y_prime
+        return X_prime, Y_prime
+
+
 class KCGD14(ABEnc):
     def __init__(self, group_obj, verbose=False):
         ABEnc.__init__(self)
         self.name = "KCGD14 SP-ABS"
         self.group = group_obj
         self.util = MSP(self.group, verbose)
+        self.registry = AttributeRegistry(self.group)
+        self.pair = group_pair(self.group)
+        # Pairing caches of the most recent max_mpks mpks, keyed by id(mpk['k1'])
+        self.master_pairings = OrderedDict()
+        self.max_mpks = 8
+
+    def setup(self, attr_universe=None, lazy=False):
+        """
+        Generate the keys of every attribute of attr_universe or, if lazy is set, only a master PRF key
+        kept in msk, so setup takes constant time whatever the universe: the secret keys of an attribute
+        are derived from it when needed (see attribute_secrets), and its public keys are added to the
+        mpk when the attribute is first issued by keygen or published with publish.
+        """
+
+        assert lazy or attr_universe is not None, "an attribute universe is needed unless the keys are derived lazily"
+        # Intern the attribute universe ahead of time
+        if attr_universe is not None:
+            self.registry.prewarm(attr_universe, g1=False)
 
-    def setup(self, attr_universe):
         # pick group elements from the two source groups
         g1, g2, h1 = self.group.random(G1), self.group.random(G2), self.group.random(G1)
         k1, k2, k3 = self.group.random(G1), self.group.random(G2), self.group.random(G1)
@@ -32,6 +120,12 @@ class KCGD14(ABEnc):
         # Compute the master public key 
         X, Y = g2 ** x, g2 ** y
         
+        if lazy:
+            # The PRF key is kept as a hex string so that the msk can be encoded with wire
+            msk = {'x_psdo': x, 'y_psdo': y, 'prf_key': os.urandom(32).hex()}
+            mpk = {'g1': g1, 'g2': g2, 'h1': h1, 'k1': k1, 'k2': k2, 'k3': k3, 'X_attr': {}, 'Y_attr': {}, 'X_psdo': X, 'Y_psdo': Y}
+            return mpk, msk
+
         x_attr, y_attr = {}, {}
         X_attr, Y_attr = {}, {}
         
@@ -47,39 +141,102 @@ class KCGD14(ABEnc):
         
         return mpk, msk
 
+    def attribute_secrets(self, msk, attr):
+        # (x_attr, y_attr) of an attribute, derived as HMAC-SHA256(prf_key, label || attr) hashed into ZR for a lazy msk
+        if 'prf_key' not in msk:
+            return msk['x_attr'][attr], msk['y_attr'][attr]
+        prf_key = bytes.fromhex(msk['prf_key'])
+        return tuple(self.group.hash(hmac.new(prf_key, label + attr.encode('utf-8'), hashlib.sha256).digest(), ZR)
+                     for label in (b'x:', b'y:'))
+
+    def publish(self, mpk, msk, attr_list):
+        """
+        Add the public keys X_attr = g2^x_attr and Y_attr = g2^y_attr of the attributes of a lazy msk
+        to the mpk (attributes already published are skipped). Every attribute of a policy needs its
+        public keys to sign and verify, so the authority publishes the attributes that no user holds yet.
+        """
+
+        if 'prf_key' not in msk:
+            return mpk
+        for attr in attr_list:
+            if attr not in mpk['X_attr']:
+                x, y = self.attribute_secrets(msk, attr)
+                mpk['Y_attr'][attr] = mpk['g2'] ** y
+                mpk['X_attr'][attr] = mpk['g2'] ** x
+        return mpk
+
+    def unpublished(self, mpk, attr_list):
+        # Attributes without public keys in mpk, e.g., not yet published by the authority of a lazy msk
+        return [attr for attr in attr_list if attr not in mpk['X_attr'] or attr not in mpk['Y_attr']]
+
+    def precompute(self, mpk):
+        # Build fixed-base tables for the generators g1, g2, h1, k1, k2 and k3; later exponentiations use them automatically,
+        # and the pairing cache of the mpk used by sign
+        self.pairings(mpk)
+        return fixed_base.precompute(mpk, ['g1', 'g2', 'h1', 'k1', 'k2', 'k3'])
+
+    def pairings(self, mpk):
+        # Pairing cache of mpk (see MasterPairings), created once per mpk
+        key = id(mpk['k1'])
+        entry = self.master_pairings.get(key)
+        if entry is None or not entry.matches(mpk):
+            entry = MasterPairings(self.group, self.pair, mpk)
+            self.master_pairings[key] = entry
+            while len(self.master_pairings) > self.max_mpks:
+                self.master_pairings.popitem(last=False)
+        else:
+            self.master_pairings.move_to_end(key)
+        return entry
+
+    def challenge(self, lamb, V, T, K, U, K_hat, U_hat, Z, msg, fs_version=FS_LEGACY):
+        # Fiat-Shamir challenge, in the legacy string form (which leaves msg out) or as a byte transcript
+        if fs_version == FS_LEGACY:
+            return self.group.hash(str(lamb) + str(V) + str(T) + str(K) + str(U) + str(K_hat) + str(U_hat) + str(Z), ZR)
+        check_version(fs_version)
+        transcript = Transcript(self.group, 'KCGD14-SP-ABS', fs_version)
+        for label, value in (('lamb', lamb), ('V', V), ('T', T), ('K', K), ('U', U), ('K_hat', K_hat), ('U_hat', U_hat), ('Z', Z), ('msg', msg)):
+            transcript.absorb(label, value)
+        return transcript.challenge()
+
     def keygen(self, mpk, msk, attr_list):
         # User chooses a pair of public and secret key
         id_u = self.group.random(ZR)
         sk_u = self.group.random(ZR)
         pk_u = mpk['h1'] ** sk_u
     
-        # AA generates attribute keys for users
+        # AA generates attribute keys for users, publishing the attributes issued for the first time
+        self.publish(mpk, msk, attr_list)
         sigma, r_attr = {}, {}
         for attr in attr_list:
             r = self.group.random(ZR)      
             r_attr[attr] = r
-            sigma[attr] = (mpk['g1'] * pk_u) ** (1 / (msk['x_attr'][attr] + r * msk['y_attr'][attr]  + self.group.hash(str(attr) + str(id), ZR)))
+            x_attr, y_attr = self.attribute_secrets(msk, attr)
+            sigma[attr] = (mpk['g1'] * pk_u) ** (1 / (x_attr + r * y_attr  + self.group.hash(str(attr) + str(id), ZR)))
         
         sk = {'attr_list': attr_list, 'sk_u': sk_u, 'pk_u': pk_u, 'id_u': id_u, 'sigma': sigma, 'r_attr': r_attr}
                 
         return sk
 
-    def sign(self, mpk, sk, msg, policy_str, attr_list):
+    def sign(self, mpk, sk, msg, policy_str, attr_list, fs_version=FS_LEGACY):
         # Convert the policy into MSP
-        policy = self.util.createPolicy(policy_str)
-        mono_span_prog = self.util.convert_policy_to_msp(policy)
-        num_cols = self.util.len_longest_row
+        policy, mono_span_prog, num_cols = self.util.compile_policy(policy_str, sparse=True)
+        missing = self.unpublished(mpk, mono_span_prog.keys())
+        if missing:
+            raise ValueError("the attributes %s of the policy have no public keys in mpk; publish them first" % ', '.join(missing))
         
         # Compute the satisfied attribute subset
-        nodes = self.util.prune(policy, attr_list)
+        nodes = self.util.prune_min_cost(policy, attr_list)
         if not nodes:
-            print ("Policy not satisfied.")
+            raise ValueError("the signer's attributes do not satisfy the policy %r" % policy_str)
             
         stripped_nodes = []
         for node in nodes:
             attr = node.getAttributeAndIndex()
-            attr_stripped = self.util.strip_index(attr) 
+            attr_stripped = self.registry.strip_index(attr)
             stripped_nodes.append(attr_stripped) 
+        # The vector v has v_i = 1 on the satisfied rows, except below threshold gates where v_i is the
+        # reconstruction coefficient omega of the row, and 0 elsewhere
+        omega = self.util.reconstruction_coefficients(policy, nodes)
    
         # Commitments of vector         
         V, v_hat = {}, {}   
@@ -90,79 +247,68 @@ class KCGD14(ABEnc):
             beta_ti[attr] = beta_t
             ti[attr] = t
             
-            V[attr] = mpk['g1'] ** beta_v * mpk['k3'] ** beta_t
+            V[attr] = multiexp([mpk['g1'], mpk['k3']], [beta_v, beta_t])
             if attr in stripped_nodes:
-                v_hat[attr] = mpk['g1'] * mpk['k3'] ** t
+                v_hat[attr] = (mpk['g1'] ** omega[attr] if attr in omega else mpk['g1']) * mpk['k3'] ** t
             else:
                 v_hat[attr] = mpk['k3'] ** t
          
-        # Proof of Statement
+        # Proof of Statement: the k3 terms of a column share their base, so their exponents are summed
         A, lamb = {}, {}
         for j in range(num_cols - 1):
-            a, la = 1, 1
-            for attr in mono_span_prog.keys():
-                M_ij = mono_span_prog[attr][j]
-                a *= mpk['k3'] ** (ti[attr] * M_ij)
-                la *= mpk['k3'] ** (beta_ti[attr] * M_ij)
+            a, la = 0, 0
+            for attr, M_ij in mono_span_prog.columns[j]:
+                a += ti[attr] * M_ij
+                la += beta_ti[attr] * M_ij
                 
-            A[j] = a
-            lamb[j] = la
+            A[j] = mpk['k3'] ** a
+            lamb[j] = mpk['k3'] ** la
         
         # Commitments of sigma, r, and signer identity id
         T, K, K_hat = {}, {}, {}
         X_prime, Y_prime, T_prime = {}, {}, {}
-        X_ij_prime, Y_ij_prime, T_ij_prime, R_ij_prime = {}, {}, {}, {}
         rho_id, rho_sk, beta_rho_id, beta_sk, beta_rho_sk, beta_id = self.group.random(ZR), self.group.random(ZR), self.group.random(ZR), self.group.random(ZR), self.group.random(ZR), self.group.random(ZR)
         rho_vi, rho_ri, rho_i = {}, {}, {}
         beta_rho_vi, beta_rho_ri, beta_id_rho_vi, beta_ri, beta_rho_i, beta_ri_rho_vi = {}, {}, {}, {}, {}, {}
         
-        R = pair(mpk['k1'], mpk['g2'])
-        D_prime = pair(mpk['k1'], mpk['Y_psdo'])
+        pairings = self.pairings(mpk)
+        R = pairings.R
         Z = sk['pk_u'] * mpk['k1'] ** rho_sk
-        U = mpk['g2'] ** sk['id_u'] * mpk['k2'] ** rho_id      
-        Z_hat = mpk['h1'] ** beta_sk * mpk['k1'] ** beta_rho_sk
-        U_hat = mpk['g2'] ** beta_id * mpk['k2'] **  beta_rho_id        
+        U = multiexp([mpk['g2'], mpk['k2']], [sk['id_u'], rho_id])
+        Z_hat = multiexp([mpk['h1'], mpk['k1']], [beta_sk, beta_rho_sk])
+        U_hat = multiexp([mpk['g2'], mpk['k2']], [beta_id, beta_rho_id])
         
         for attr in mono_span_prog.keys():
             rho_vi[attr], rho_ri[attr], beta_rho_vi[attr], beta_rho_ri[attr], beta_id_rho_vi[attr], beta_ri[attr], beta_rho_i[attr], beta_ri_rho_vi[attr] = self.group.random(ZR), self.group.random(ZR), self.group.random(ZR), self.group.random(ZR), self.group.random(ZR), self.group.random(ZR), self.group.random(ZR), self.group.random(ZR)
             
             if attr in stripped_nodes:
-                T[attr] = sk['sigma'][attr] * mpk['k1'] ** rho_vi[attr]
-                K[attr] = mpk['Y_attr'][attr] ** sk['r_attr'][attr] * mpk['k2'] ** rho_ri[attr]
+                T[attr] = (sk['sigma'][attr] ** omega[attr] if attr in omega else sk['sigma'][attr]) * mpk['k1'] ** rho_vi[attr]
+                K[attr] = multiexp([mpk['Y_attr'][attr], mpk['k2']], [sk['r_attr'][attr], rho_ri[attr]])
             else:
                 T[attr] = mpk['k1'] ** rho_vi[attr]       
                 K[attr] = mpk['k2'] ** rho_ri[attr]
                      
-            K_hat[attr] = mpk['Y_attr'][attr] ** beta_ri[attr] * mpk['k2'] ** beta_rho_ri[attr]
+            K_hat[attr] = multiexp([mpk['Y_attr'][attr], mpk['k2']], [beta_ri[attr], beta_rho_ri[attr]])
             rho_i[attr] = rho_ri[attr] + rho_id
             
-            # Simplification
-            X_prime[attr] = pair(mpk['k1'], mpk['X_attr'][attr]) 
+            # Simplification: X'_i = e(k1, X_i) and Y'_i = e(k1, Y_i) only depend on the mpk
+            X_prime[attr], Y_prime[attr] = pairings.attribute(attr)
             #* mpk['g2'] ** self.group.hash(str(attr) + str(id), ZR))
-            Y_prime[attr] = pair(mpk['k1'], mpk['Y_attr'][attr])
-            T_prime[attr] = pair(T[attr], mpk['k2'])
-            
-            # Knowledge of Exponents
-            X_ij_prime[attr] = {}
-            Y_ij_prime[attr] = {}
-            T_ij_prime[attr] = {}
-            R_ij_prime[attr] = {}
-            for j in range(num_cols - 1):
-                M_ij = mono_span_prog[attr][j]
-                X_ij_prime[attr][j] = X_prime[attr] ** (M_ij * beta_rho_vi[attr])
-                Y_ij_prime[attr][j] = Y_prime[attr] ** (M_ij * beta_ri_rho_vi[attr])
-                T_ij_prime[attr][j] = T_prime[attr] ** (M_ij * beta_rho_i[attr])
-                R_ij_prime[attr][j] = R ** (M_ij * beta_id_rho_vi[attr])
+            T_prime[attr] = self.pair(T[attr], mpk['k2'])
          
+        # Knowledge of Exponents: B[j] = prod_i (X'_i^beta_rho_vi * Y'_i^beta_ri_rho_vi * T'_i^beta_rho_i * R^beta_id_rho_vi)^(M_ij)
         B = {}
         for j in range(num_cols - 1):
-            b = 1
-            for attr in mono_span_prog.keys():       
-                b *= X_ij_prime[attr][j] * Y_ij_prime[attr][j] * T_ij_prime[attr][j] * R_ij_prime[attr][j]
-            B[j] = b
+            R_exp = 0
+            B_bases, B_exps = [], []
+            for attr, M_ij in mono_span_prog.columns[j]:
+                B_bases += [X_prime[attr], Y_prime[attr], T_prime[attr]]
+                B_exps += [M_ij * beta_rho_vi[attr], M_ij * beta_ri_rho_vi[attr], M_ij * beta_rho_i[attr]]
+                R_exp += M_ij * beta_id_rho_vi[attr]
+            B[j] = multiexp(B_bases + [R], B_exps + [R_exp])
         
         # Schnorr signature
-        c = self.group.hash(str(lamb) + str(V) + str(T) + str(K) + str(U) + str(K_hat) + str(U_hat) + str(Z), ZR)
+        c = self.challenge(lamb, V, T, K, U, K_hat, U_hat, Z, msg, fs_version)
         
         s_vi, s_ti, s_rho_vi, s_ri_rho_vi, s_rho_i, s_ri, s_rho_ri, s_id_rho_vi = {}, {}, {}, {}, {}, {}, {}, {}
         s_id = beta_id + c * sk['id_u']
@@ -172,7 +318,7 @@ class KCGD14(ABEnc):
         
         for attr in mono_span_prog.keys():
             if attr in stripped_nodes:
-                s_vi[attr] = beta_vi[attr] + c
+                s_vi[attr] = beta_vi[attr] + (c * omega[attr] if attr in omega else c)
                 s_ri_rho_vi[attr] = beta_ri_rho_vi[attr] + c * sk['r_attr'][attr] * rho_vi[attr]
                 s_ri[attr] = beta_ri[attr] + c * sk['r_attr'][attr]
             else: 
@@ -191,38 +337,57 @@ class KCGD14(ABEnc):
             
         return signature
         
-    def verify(self, mpk, signature, policy_str, msg):    
+    def verify(self, mpk, signature, policy_str, msg, optimized=True, fs_version=FS_LEGACY):    
         # Convert the policy into MSP
-        policy = self.util.createPolicy(policy_str)
-        mono_span_prog = self.util.convert_policy_to_msp(policy)
-        num_cols = self.util.len_longest_row    
+        policy, mono_span_prog, num_cols = self.util.compile_policy(policy_str, sparse=True)
+        if self.unpublished(mpk, mono_span_prog.keys()):
+            return False
     
         V, K_hat = {}, {}
         lamb, B, E = {}, {}, {}
-        for j in range(num_cols - 1):
-            e = 1
-            for attr in mono_span_prog.keys():       
-                e *= pair(signature['T'][attr], (mpk['X_attr'][attr] * signature['K'][attr] * signature['U']) ** mono_span_prog[attr][j])
-            E[j] = e / (pair(mpk['g1'], mpk['g2']) * pair(signature['pk_u'], mpk['g2']))
+        if optimized:
+            # e(T_i, (X_i K_i U)^M_ij) = e(T_i, X_i K_i U)^M_ij: pair once per attribute, skip zero entries,
+            # and compute e(g1, g2) * e(pk_u, g2) = e(g1 * pk_u, g2) once for all columns
+            E_denom = self.pair(mpk['g1'] * signature['pk_u'], mpk['g2'])
+            E_attr = {}
+            for attr in mono_span_prog.keys():
+                E_attr[attr] = self.pair(signature['T'][attr], mpk['X_attr'][attr] * signature['K'][attr] * signature['U'])
+            for j in range(num_cols - 1):
+                E_bases, E_exps = [E_denom], [-1]
+                for attr, M_ij in mono_span_prog.columns[j]:
+                    E_bases.append(E_attr[attr])
+                    E_exps.append(M_ij)
+                E[j] = multiexp(E_bases, E_exps)
+        else:
+            for j in range(num_cols - 1):
+                e = 1
+                for attr in mono_span_prog.keys():       
+                    e *= self.pair(signature['T'][attr], (mpk['X_attr'][attr] * signature['K'][attr] * signature['U']) ** mono_span_prog.dense[attr][j])
+                E[j] = e / (self.pair(mpk['g1'], mpk['g2']) * self.pair(signature['pk_u'], mpk['g2']))
 
-        U_hat = mpk['g2'] ** signature['schnorr_sigma']['s_id'] * mpk['k2'] ** signature['schnorr_sigma']['s_rho_id'] * signature['U'] ** (- signature['schnorr_sigma']['c'])
-        Z_hat = mpk['h1'] ** signature['schnorr_sigma']['s_sk'] * mpk['k1'] ** signature['schnorr_sigma']['s_rho_sk'] * signature['Z'] ** (- signature['schnorr_sigma']['c'])
+        schnorr_sigma = signature['schnorr_sigma']
+        c = schnorr_sigma['c']
+        U_hat = multiexp([mpk['g2'], mpk['k2'], signature['U']], [schnorr_sigma['s_id'], schnorr_sigma['s_rho_id'], -c])
+        Z_hat = multiexp([mpk['h1'], mpk['k1'], signature['Z']], [schnorr_sigma['s_sk'], schnorr_sigma['s_rho_sk'], -c])
         
         for attr in mono_span_prog.keys():
-            V[attr] = mpk['g1'] ** signature['schnorr_sigma']['s_vi'][attr] * mpk['k3'] ** signature['schnorr_sigma']['s_ti'][attr] * signature['v_hat'][attr] ** (- signature['schnorr_sigma']['c'])
-            K_hat[attr] = mpk['Y_attr'][attr] ** signature['schnorr_sigma']['s_ri'][attr] * mpk['k2'] ** signature['schnorr_sigma']['s_rho_ri'][attr] * signature['K'][attr] ** (- signature['schnorr_sigma']['c'])
+            V[attr] = multiexp([mpk['g1'], mpk['k3'], signature['v_hat'][attr]], [schnorr_sigma['s_vi'][attr], schnorr_sigma['s_ti'][attr], -c])
+            K_hat[attr] = multiexp([mpk['Y_attr'][attr], mpk['k2'], signature['K'][attr]], [schnorr_sigma['s_ri'][attr], schnorr_sigma['s_rho_ri'][attr], -c])
         
         for j in range(num_cols - 1):
-            la, b = signature['A'][j] ** (- signature['schnorr_sigma']['c']), E[j] ** (- signature['schnorr_sigma']['c']) 
-            for attr in mono_span_prog.keys():  
-                la *=  mpk['k3'] ** (mono_span_prog[attr][j] * signature['schnorr_sigma']['s_ti'][attr])
-                b *= signature['X_prime'][attr] ** (mono_span_prog[attr][j] * signature['schnorr_sigma']['s_rho_vi'][attr]) * signature['Y_prime'][attr] ** (mono_span_prog[attr][j] * signature['schnorr_sigma']['s_ri_rho_vi'][attr]) * signature['R'] ** (mono_span_prog[attr][j] * signature['schnorr_sigma']['s_id_rho_vi'][attr]) * signature['T_prime'][attr] ** (mono_span_prog[attr][j] * signature['schnorr_sigma']['s_rho_i'][attr]) 
-            lamb[j] = la
-            B[j] = b
+            la_exp, R_exp = 0, 0
+            b_bases, b_exps = [E[j]], [-c]
+            for attr, M_ij in mono_span_prog.columns[j]:
+                la_exp += M_ij * schnorr_sigma['s_ti'][attr]
+                b_bases += [signature['X_prime'][attr], signature['Y_prime'][attr], signature['T_prime'][attr]]
+                b_exps += [M_ij * schnorr_sigma['s_rho_vi'][attr], M_ij * schnorr_sigma['s_ri_rho_vi'][attr], M_ij * schnorr_sigma['s_rho_i'][attr]]
+                R_exp += M_ij * schnorr_sigma['s_id_rho_vi'][attr]
+            lamb[j] = signature['A'][j] ** (-c) * mpk['k3'] ** la_exp
+            B[j] = multiexp(b_bases + [signature['R']], b_exps + [R_exp])
     
-        c = self.group.hash(str(lamb) + str(V) + str(signature['T']) + str(signature['K']) + str(signature['U']) + str(K_hat) + str(U_hat) + str(signature['Z']), ZR)
+        c_prime = self.challenge(lamb, V, signature['T'], signature['K'], signature['U'], K_hat, U_hat, signature['Z'], msg, fs_version)
         
-        if signature['schnorr_sigma']['c'] == c:
+        if c == c_prime:
             return True
         else:
             return False
@@ -7,10 +7,17 @@
 :Date:            02/2025
 '''
 
+from collections import OrderedDict
+
 from charm.toolbox.pairinggroup import PairingGroup, ZR, G1, G2, GT, pair
 from charm.toolbox.ABEnc import ABEnc
 from msp import MSP
-import numpy as np
+from attr_registry import AttributeRegistry
+import fixed_base
+from multiexp import multiexp
+from multipairing import group_pair, pair_prod_equals
+from transcript import Transcript, FS_LEGACY, check_version
+import zr_poly
 
 debug = False
 
@@ -20,6 +27,11 @@ class RD16(ABEnc):
         self.name = "RD16 KP-ABS"
         self.group = group_obj
         self.util = MSP(self.group, verbose)
+        self.registry = AttributeRegistry(self.group)
+        self.pair = group_pair(self.group)
+        # Digit tables of the u generators of the most recent max_mpks mpks, keyed by id(mpk['u']) as (u, tables)
+        self.digit_tables = OrderedDict()
+        self.max_mpks = 8
 
     def setup(self, n):
         # pick two generators from the two source groups
@@ -38,18 +50,60 @@ class RD16(ABEnc):
             u.append(self.group.random(G1))
         
         # Compute the master public key 
-        Y = pair(g1, g2) ** alpha
+        Y = self.pair(g1, g2) ** alpha
       
         msk = {'alpha': alpha}
         mpk = {'g1': g1, 'g2': g2, 'Y': Y, 'V': V, 'u': u, 'n': n}
+        self.u_tables(mpk)
         
         return mpk, msk
 
+    def precompute(self, mpk):
+        # Build fixed-base tables for g1, g2 and V[0..n]; later exponentiations use them automatically
+        # and the digit tables of u used by the message encoding
+        self.u_tables(mpk)
+        return fixed_base.precompute(mpk, ['g1', 'g2', 'V'])
+
+    def u_tables(self, mpk):
+        # Tables u[j]^0..u[j]^9 of the generators of mpk, built once per mpk
+        key = id(mpk['u'])
+        entry = self.digit_tables.get(key)
+        if entry is None or entry[0] is not mpk['u']:
+            entry = (mpk['u'], [fixed_base.digit_table(u_j) for u_j in mpk['u']])
+            self.digit_tables[key] = entry
+            while len(self.digit_tables) > self.max_mpks:
+                self.digit_tables.popitem(last=False)
+        else:
+            self.digit_tables.move_to_end(key)
+        return entry[1]
+
+    def encode_message(self, mpk, signed_msg):
+        """
+        Waters hash u[0] * prod_j u[j]^(d_j) of the decimal digits d_1, d_2, ... of the message hash,
+        computed from the digit tables with one multiplication per nonzero digit.
+        """
+
+        tables = self.u_tables(mpk)
+        assert len(signed_msg) < len(tables), "the message hash has more digits than there are u generators"
+        encoded = mpk['u'][0]
+        for table, digit in zip(tables[1:], signed_msg):
+            d = int(digit)
+            if d:
+                encoded = encoded * table[d]
+        return encoded
+
+    def message_hash(self, msg, sigma_2, attr_list, fs_version=FS_LEGACY):
+        # Hash of the message bound to sigma_2 and the attribute list, in the legacy string form or as a byte transcript
+        if fs_version == FS_LEGACY:
+            return self.group.hash(str(msg) + str(sigma_2) + str(attr_list), ZR)
+        check_version(fs_version)
+        transcript = Transcript(self.group, 'RD16-KP-ABS', fs_version)
+        transcript.absorb('msg', msg).absorb('sigma_2', sigma_2).absorb('attr_list', list(attr_list))
+        return transcript.challenge()
+
     def keygen(self, mpk, msk, policy_str):
         # Convert the policy into MSP
-        policy = self.util.createPolicy(policy_str)
-        mono_span_prog = self.util.convert_policy_to_msp(policy)
-        num_cols = self.util.len_longest_row
+        policy, mono_span_prog, num_cols = self.util.compile_policy(policy_str, sparse=True)
         
         # pick random shares
         v = [msk['alpha']]
@@ -59,46 +113,44 @@ class RD16(ABEnc):
 
         # Compute the secret key        
         D, D_prime, D_prime_prime = {}, {}, {}
-        for attr, row in mono_span_prog.items():
-            attr_stripped = self.util.strip_index(attr)
-            attr_hash = self.group.hash(attr_stripped, ZR)           
+        shares = mono_span_prog.matrix.shares(v)
+        for attr in mono_span_prog.keys():
+            attr_stripped = self.registry.strip_index(attr)
+            attr_hash = self.registry.hash_zr(attr_stripped)
             r = self.group.random(ZR)
-            len_row = len(row)
-            Mivtop = sum(i[0] * i[1] for i in zip(row, v[:len_row]))
+            Mivtop = shares[attr]
             D[attr] = mpk['g1'] ** Mivtop * mpk['V'][0] ** r
             D_prime[attr] = mpk['g2'] ** r
 
+            # attr_hash^(x-1) for x = 2..n from one table of powers
+            hash_powers = zr_poly.powers(self.group, attr_hash, mpk['n'])
             D_prime_prime[attr] = {}
             for x in range(2, mpk['n'] + 1):
-                D_prime_prime[attr][x] = (mpk['V'][1] ** (-attr_hash ** (x - 1)) * mpk['V'][x]) ** r
+                D_prime_prime[attr][x] = mpk['V'][1] ** (-hash_powers[x - 1] * r) * mpk['V'][x] ** r
 
         sk = {'policy_str': policy_str, 'D': D, 'D_prime': D_prime, 'D_prime_prime': D_prime_prime}
                 
         return sk
 
-    def sign(self, mpk, sk, msg, policy_str, attr_list):
+    def sign(self, mpk, sk, msg, policy_str, attr_list, fs_version=FS_LEGACY):
         # Convert the policy into MSP
-        policy = self.util.createPolicy(policy_str)
-        mono_span_prog = self.util.convert_policy_to_msp(policy)
-        num_cols = self.util.len_longest_row
+        policy, mono_span_prog, num_cols = self.util.compile_policy(policy_str)
        	 
-        nodes = self.util.prune(policy, attr_list)
+        nodes = self.util.prune_min_cost(policy, attr_list)
         if not nodes:
-            print ("Policy not satisfied.")
+            raise ValueError("the signer's attributes do not satisfy the policy %r" % policy_str)
+        # Keys of rows below threshold gates enter with their reconstruction coefficient omega, all others with 1
+        omega = self.util.reconstruction_coefficients(policy, nodes)
 
-        # Construct a polynomial with roots at each attribute in the attribute list    
+        # Construct a polynomial with roots at each attribute in the attribute list, with its n coefficients in ascending order.
+        # The verifier rebuilds it from attr_list, so every attribute of attr_list is a root, not only those of the
+        # rows used to sign (which are among them)
         W = []
-        for node in nodes:
-            attr = node.getAttributeAndIndex()
-            attr_stripped = self.util.strip_index(attr) 
-            attr_hash = self.group.hash(attr_stripped, ZR)
+        for attr in attr_list:
+            attr_hash = self.registry.hash_zr(attr)
             W.append(attr_hash)
                
-        poly_coeffs = np.poly(W)        
-        y = poly_coeffs[::-1]
-        
-        while len(y) < mpk['n']:
-            y.append(0)
+        y = zr_poly.from_roots(self.group, W, mpk['n'])
         
         #if mpk['V'][1] ** y[0] == (mpk['V'][1] ** -W[0]) ** (y[1]) * (mpk['V'][1] ** (-W[0] ** 2)) ** (y[2]):
         #    print('This is right')
@@ -112,26 +164,35 @@ class RD16(ABEnc):
         sigma_1 = mpk['g2'] ** theta
         sigma_2 = mpk['g2'] ** epsilon           
         sigma_3_p1 = 1
+        p1_bases, p1_exps = [], []
         
-        for attr in attr_list:
+        # Only the key components of the rows used to sign enter sigma
+        for node in nodes:
+            attr = node.getAttributeAndIndex()
+            if attr in omega:
+                sigma_2 *= sk['D_prime'][attr] ** omega[attr]
+                p1_bases.append(sk['D'][attr])
+                p1_exps.append(omega[attr])
+                for x in range(2, mpk['n'] + 1):
+                    p1_bases.append(sk['D_prime_prime'][attr][x])
+                    p1_exps.append(y[x - 1] * omega[attr])
+                continue
+
             sigma_2 *= sk['D_prime'][attr]
                        
             sigma_3_p1 *= sk['D'][attr]
             for x in range(2, mpk['n'] + 1):
-                sigma_3_p1 *= sk['D_prime_prime'][attr][x] ** y[x - 1] 
+                p1_bases.append(sk['D_prime_prime'][attr][x])
+                p1_exps.append(y[x - 1])
+        sigma_3_p1 *= multiexp(p1_bases, p1_exps)
             
-        sigma_3_p2 = mpk['V'][0]
-        for k in range(1, mpk['n'] + 1):
-            sigma_3_p2 *= mpk['V'][k] ** y[k - 1]             
+        sigma_3_p2 = mpk['V'][0] * multiexp(mpk['V'][1:mpk['n'] + 1], y[:mpk['n']])
         sigma_3_p2 **= epsilon 
  
-        signed_msg = self.group.hash(str(msg) + str(sigma_2) + str(attr_list), ZR)
+        signed_msg = self.message_hash(msg, sigma_2, attr_list, fs_version)
         signed_msg = str(signed_msg)    
                     
-        sigma_3_p3 = mpk['u'][0]
-        for j in range(len(signed_msg)):
-            sigma_3_p3 *= mpk['u'][j] ** int(signed_msg[j])
-        sigma_3_p3 **= theta
+        sigma_3_p3 = self.encode_message(mpk, signed_msg) ** theta
                    
         sigma_3 = sigma_3_p1 * sigma_3_p2 * sigma_3_p3
         
@@ -139,34 +200,28 @@ class RD16(ABEnc):
             
         return signature
                 
-    def verify(self, mpk, signature, attr_list, msg):       
+    def verify(self, mpk, signature, attr_list, msg, fs_version=FS_LEGACY):       
         # Recompute the signed message
-        signed_msg = self.group.hash(str(msg) + str(signature['sigma_2']) + str(attr_list), ZR)
+        signed_msg = self.message_hash(msg, signature['sigma_2'], attr_list, fs_version)
         signed_msg = str(signed_msg)
-        print(len(signed_msg))
         
         # Recompute all the y_values from the polynomial
+        if len(attr_list) >= mpk['n']:
+            # The polynomial would need more than n coefficients
+            return False
         W = []
         for attr in attr_list:
-            attr_hash = self.group.hash(attr, ZR)
+            attr_hash = self.registry.hash_zr(attr)
             W.append(attr_hash)
             
-        poly_coeffs = np.poly(W)        
-        y = poly_coeffs[::-1]
-        
-        while len(y) < mpk['n']:
-            y.append(0)        
+        y = zr_poly.from_roots(self.group, W, mpk['n'])
         
-        e1 = mpk['V'][0]
-        for k in range(1, mpk['n'] + 1):
-            e1 *= mpk['V'][k] ** y[k - 1]
-
-        e2 = mpk['u'][0]
-        for j in range(len(signed_msg)):
-            print(len(signed_msg))
-            e2 *= mpk['u'][j] ** int(signed_msg[j])
+        e1 = mpk['V'][0] * multiexp(mpk['V'][1:mpk['n'] + 1], y[:mpk['n']])
+
+        e2 = self.encode_message(mpk, signed_msg)
         
-        if pair(signature['sigma_3'], mpk['g2']) == mpk['Y'] * pair(e1, signature['sigma_2']) * pair(e2, signature['sigma_1']):     
+        # e(sigma_3, g2) == Y * e(e1, sigma_2) * e(e2, sigma_1), checked with a single final exponentiation
+        if pair_prod_equals(self.group, [signature['sigma_3'], e1 ** -1, e2 ** -1], [mpk['g2'], signature['sigma_2'], signature['sigma_1']], mpk['Y']):
             return True
         else:
             return False
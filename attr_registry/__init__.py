@@ -0,0 +1,89 @@
+"""
+Attribute registry shared by the ABS schemes.
+Every attribute string is interned once and the values derived from it are cached:
+- stripped: the attribute without its index (i.e., x_y -> x), as returned by MSP.strip_index;
+- id: a small integer identifying the attribute while it stays in the registry;
+- hash_g1 / hash_zr: the hash of the attribute into G1 and ZR, computed on first use.
+Entries are evicted in least-recently-used order once max_entries attributes are interned.
+"""
+
+from collections import OrderedDict
+import threading
+
+from charm.toolbox.pairinggroup import ZR, G1
+
+
+class AttributeEntry:
+    __slots__ = ('name', 'stripped', 'id', 'hash_g1', 'hash_zr')
+
+    def __init__(self, name, stripped, attr_id):
+        self.name = name
+        self.stripped = stripped
+        self.id = attr_id
+        self.hash_g1 = None
+        self.hash_zr = None
+
+
+class AttributeRegistry:
+    def __init__(self, group_obj, max_entries=65536):
+        assert max_entries > 0, "registry size must be positive"
+        self.group = group_obj
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, attr):
+        return attr in self._entries
+
+    def lookup(self, attr):
+        """
+        Return the entry of an attribute, interning it first if it is not registered.
+        """
+
+        with self._lock:
+            entry = self._entries.get(attr)
+            if entry is not None:
+                self._entries.move_to_end(attr)
+                return entry
+            stripped = attr.split('_')[0] if attr.find('_') != -1 else attr
+            entry = AttributeEntry(attr, stripped, self._next_id)
+            self._next_id += 1
+            self._entries[attr] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return entry
+
+    def strip_index(self, attr):
+        return self.lookup(attr).stripped
+
+    def hash_g1(self, attr):
+        entry = self.lookup(attr)
+        if entry.hash_g1 is None:
+            entry.hash_g1 = self.group.hash(attr, G1)
+        return entry.hash_g1
+
+    def hash_zr(self, attr):
+        entry = self.lookup(attr)
+        if entry.hash_zr is None:
+            entry.hash_zr = self.group.hash(attr, ZR)
+        return entry.hash_zr
+
+    def prewarm(self, attr_universe, g1=True, zr=False):
+        """
+        Intern every attribute of the universe and compute the requested hashes ahead of time.
+        """
+
+        for attr in attr_universe:
+            self.lookup(attr)
+            if g1:
+                self.hash_g1(attr)
+            if zr:
+                self.hash_zr(attr)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,241 @@
+"""
+Benchmark suite for the ABS schemes.
+Every operation is timed with time.perf_counter_ns after a number of warmup iterations, and is
+reported with its median, 95th percentile, standard deviation, mean and minimum (in ms):
+- setup is timed on its own;
+- keygen, sign and verify are timed against a single mpk (and a single key and signature), so
+    setup never leaks into their timings.
+Every record also carries the sizes in bytes of the mpk, the secret key and the signature in the
+wire format (see wire). Results are lists of flat records, written as JSON or CSV and compared
+against a saved baseline by the command line (python -m benchmark).
+It provides the following functions:
+- policy_and_attributes: the benchmark policy with n attributes, satisfied by the first m;
+- policy_parameters: the MSP dimensions of a policy and the number of attributes used in signing;
+- time_operation / summarize: timing of one operation and its statistics;
+- bench_scheme: the records of one scheme on one policy;
+- bench_curve / curve_matrix: the records of all schemes and sizes on one curve, and on every
+    curve of a list, each curve in a fresh process;
+- matrix_table: one row per curve, scheme and sizes with the latencies and byte sizes;
+- available_curves: the pairing curves known to the local charm build;
+- write_json / write_csv / load_json / compare: result files and regression checks.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import csv
+import json
+import math
+import multiprocessing
+import statistics
+import time
+
+from charm.toolbox.pairinggroup import PairingGroup
+import wire
+from FABS_kp import FABS_KPABS
+from FABS_sp import FABS_SPABS
+from KCGD14_sp import KCGD14
+from RD16_kp import RD16
+from msp import MSP
+
+# Scheme name -> (class, type), where KP schemes take the policy in keygen and SP schemes in sign
+SCHEMES = {
+    'FABS_KPABS': (FABS_KPABS, 'kp'),
+    'RD16': (RD16, 'kp'),
+    'FABS_SPABS': (FABS_SPABS, 'sp'),
+    'KCGD14': (KCGD14, 'sp'),
+}
+
+OPERATIONS = ['setup', 'keygen', 'sign', 'verify']
+
+FIELDS = ['curve', 'scheme', 'policy_size', 'attr_size', 'rows', 'cols', 'used', 'operation',
+          'iterations', 'median_ms', 'p95_ms', 'stddev_ms', 'mean_ms', 'min_ms',
+          'mpk_bytes', 'sk_bytes', 'sig_bytes']
+
+# Curves tried when the local charm build does not list its own
+DEFAULT_CURVES = ['BN254', 'MNT224', 'SS512']
+
+MSG = 'hello world'
+
+
+def policy_and_attributes(m, n):
+    """
+    Return the policy (1 and ... and m) or (m+1 and ... and n) and the attribute list 1..m.
+    """
+
+    policy_str = '(1'
+    attr_list = [str(i) for i in range(1, m + 1)]
+    for i in range(2, n + 1):
+        policy_str += (') or (' if i == m + 1 else ' and ') + str(i)
+    policy_str += ')'
+    return policy_str, attr_list
+
+
+def policy_parameters(group, policy_str, attr_list):
+    # Number of rows and columns of the MSP, and number of attributes used in signing
+    util = MSP(group, verbose=False)
+    policy, mono_span_prog, num_cols = util.compile_policy(policy_str)
+    return len(mono_span_prog), num_cols, len(util.prune_min_cost(policy, attr_list))
+
+
+def time_operation(operation, iterations, warmup):
+    """
+    Run operation() warmup times untimed, then iterations times; return the samples in ns and the last result.
+    """
+
+    result = None
+    for _ in range(warmup):
+        result = operation()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter_ns()
+        result = operation()
+        samples.append(time.perf_counter_ns() - start)
+    return samples, result
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+    to_ms = 1e-6
+    return {
+        'iterations': len(samples),
+        'median_ms': statistics.median(ordered) * to_ms,
+        'p95_ms': ordered[max(0, math.ceil(0.95 * len(ordered)) - 1)] * to_ms,
+        'stddev_ms': (statistics.stdev(ordered) if len(ordered) > 1 else 0.0) * to_ms,
+        'mean_ms': statistics.fmean(ordered) * to_ms,
+        'min_ms': ordered[0] * to_ms,
+    }
+
+
+def bench_scheme(group, curve, scheme_name, policy_size, attr_size, universe_size=100, iterations=10, warmup=2, setup_iterations=None):
+    """
+    Benchmark setup, keygen, sign and verify of one scheme and return one record per operation.
+    """
+
+    scheme_class, scheme_type = SCHEMES[scheme_name]
+    scheme = scheme_class(group)
+    policy_str, attr_list = policy_and_attributes(attr_size, policy_size)
+    _, attr_universe = policy_and_attributes(universe_size, 0)
+    rows, cols, used = policy_parameters(group, policy_str, attr_list)
+
+    if scheme_type == 'kp':
+        setup = lambda: scheme.setup(len(attr_list) + 1)
+    else:
+        setup = lambda: scheme.setup(attr_universe)
+    setup_samples, (mpk, msk) = time_operation(setup, setup_iterations or iterations, warmup)
+    if hasattr(scheme, 'precompute'):
+        scheme.precompute(mpk)
+
+    key_input = policy_str if scheme_type == 'kp' else attr_list
+    keygen_samples, sk = time_operation(lambda: scheme.keygen(mpk, msk, key_input), iterations, warmup)
+    sign_samples, signature = time_operation(lambda: scheme.sign(mpk, sk, MSG, policy_str, attr_list), iterations, warmup)
+    verify_input = attr_list if scheme_type == 'kp' else policy_str
+    verify_samples, valid = time_operation(lambda: scheme.verify(mpk, signature, verify_input, MSG), iterations, warmup)
+    assert valid, "%s signature did not verify" % scheme_name
+    sizes = {'mpk_bytes': len(wire.encode(group, mpk)), 'sk_bytes': len(wire.encode(group, sk)),
+             'sig_bytes': len(wire.encode(group, signature))}
+
+    records = []
+    for operation, samples in zip(OPERATIONS, [setup_samples, keygen_samples, sign_samples, verify_samples]):
+        record = {'curve': curve, 'scheme': scheme_name, 'policy_size': policy_size, 'attr_size': attr_size,
+                  'rows': rows, 'cols': cols, 'used': used, 'operation': operation}
+        record.update(summarize(samples))
+        record.update(sizes)
+        records.append(record)
+    return records
+
+
+def available_curves():
+    try:
+        from charm.toolbox.pairingcurves import params
+    except ImportError:
+        return list(DEFAULT_CURVES)
+    return list(params)
+
+
+def bench_curve(curve, schemes, policy_sizes, attr_sizes, universe_size=100, iterations=10, warmup=2, setup_iterations=None):
+    """
+    Benchmark every scheme for every policy and attribute-set size on one curve.
+    """
+
+    group = PairingGroup(curve)
+    records = []
+    for scheme_name in schemes:
+        for policy_size in policy_sizes:
+            for attr_size in attr_sizes:
+                records += bench_scheme(group, curve, scheme_name, policy_size, attr_size, universe_size,
+                                        iterations, warmup, setup_iterations)
+    return records
+
+
+def curve_matrix(curves, *args, **kwargs):
+    """
+    Run bench_curve for every curve, each in a fresh process (one at a time, so the runs do not
+    compete for cores). Return the records of all curves and a {curve: error message} dictionary
+    for the curves that failed, e.g., because the local charm build does not support them.
+    """
+
+    context = multiprocessing.get_context('spawn')
+    records, errors = [], {}
+    for curve in curves:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            try:
+                records += executor.submit(bench_curve, curve, *args, **kwargs).result()
+            except Exception as err:
+                errors[curve] = '%s: %s' % (type(err).__name__, err)
+    return records, errors
+
+
+def matrix_table(records):
+    """
+    Collapse the records into one row per curve, scheme and sizes: the median latency of every operation
+    and the byte sizes of the mpk, secret key and signature.
+    """
+
+    rows = {}
+    for record in records:
+        key = (record['curve'], record['scheme'], record['policy_size'], record['attr_size'])
+        row = rows.setdefault(key, {'curve': key[0], 'scheme': key[1], 'policy_size': key[2], 'attr_size': key[3],
+                                    'mpk_bytes': record['mpk_bytes'], 'sk_bytes': record['sk_bytes'],
+                                    'sig_bytes': record['sig_bytes']})
+        row[record['operation'] + '_ms'] = record['median_ms']
+    return list(rows.values())
+
+
+def write_json(records, path):
+    with open(path, 'w') as f:
+        json.dump({'version': 1, 'records': records}, f, indent=2)
+
+
+def load_json(path):
+    with open(path) as f:
+        return json.load(f)['records']
+
+
+def write_csv(records, path):
+    fields = FIELDS + sorted({key for record in records for key in record} - set(FIELDS))
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(records)
+
+
+def _record_key(record):
+    return (record['curve'], record['scheme'], record['policy_size'], record['attr_size'], record['operation'])
+
+
+def compare(baseline, current, threshold=0.10, metric='median_ms'):
+    """
+    Match the records of two runs and return (key, baseline value, current value, ratio, regressed) rows,
+    where regressed means the current value exceeds the baseline by more than the threshold.
+    Records present in only one of the runs are skipped.
+    """
+
+    base = {_record_key(record): record for record in baseline}
+    rows = []
+    for record in current:
+        key = _record_key(record)
+        if key not in base:
+            continue
+        old, new = base[key][metric], record[metric]
+        ratio = new / old if old else math.inf
+        rows.append((key, old, new, ratio, ratio > 1 + threshold))
+    return rows
@@ -0,0 +1,103 @@
+"""
+Command line of the benchmark suite.
+- python -m benchmark run [--schemes ...] [--policy-sizes ...] [--attr-sizes ...] [--json out.json] [--csv out.csv]
+- python -m benchmark matrix [--curves ...] [--schemes ...] [--policy-sizes ...] [--attr-sizes ...] [--json out.json] [--csv out.csv]
+- python -m benchmark compare baseline.json current.json [--threshold 0.1]
+matrix runs every curve in its own process and prints one table of latencies and byte sizes.
+compare exits with status 1 when an operation regressed by more than the threshold.
+"""
+
+import argparse
+import sys
+
+import benchmark
+
+
+def print_records(records):
+    print('{:<12}{:>8}{:>8}  {:<8}{:>12}{:>12}{:>12}'.format('Scheme', 'Policy', 'Attrs', 'Op', 'Median ms', 'P95 ms', 'Stddev ms'))
+    print('-' * 72)
+    for r in records:
+        print('{:<12}{:>8}{:>8}  {:<8}{:>12.3f}{:>12.3f}{:>12.3f}'.format(
+            r['scheme'], r['policy_size'], r['attr_size'], r['operation'], r['median_ms'], r['p95_ms'], r['stddev_ms']))
+
+
+def print_matrix(rows):
+    print('{:<8}{:<12}{:>7}{:>7}{:>11}{:>11}{:>11}{:>11}{:>9}{:>9}'.format(
+        'Curve', 'Scheme', 'Policy', 'Attrs', 'KeyGen ms', 'Sign ms', 'Verify ms', 'mpk B', 'sk B', 'sig B'))
+    print('-' * 96)
+    for r in rows:
+        print('{:<8}{:<12}{:>7}{:>7}{:>11.3f}{:>11.3f}{:>11.3f}{:>11}{:>9}{:>9}'.format(
+            r['curve'], r['scheme'], r['policy_size'], r['attr_size'], r['keygen_ms'], r['sign_ms'], r['verify_ms'],
+            r['mpk_bytes'], r['sk_bytes'], r['sig_bytes']))
+
+
+def save(records, args):
+    if args.json:
+        benchmark.write_json(records, args.json)
+    if args.csv:
+        benchmark.write_csv(records, args.csv)
+
+
+def run(args):
+    records = benchmark.bench_curve(args.curve, args.schemes, args.policy_sizes, args.attr_sizes, args.universe_size,
+                                    args.iterations, args.warmup, args.setup_iterations)
+    print_records(records)
+    save(records, args)
+    return 0
+
+
+def matrix(args):
+    records, errors = benchmark.curve_matrix(args.curves, args.schemes, args.policy_sizes, args.attr_sizes, args.universe_size,
+                                             args.iterations, args.warmup, args.setup_iterations)
+    print_matrix(benchmark.matrix_table(records))
+    for curve, error in errors.items():
+        print('%s skipped: %s' % (curve, error))
+    save(records, args)
+    return 1 if errors and not records else 0
+
+
+def compare(args):
+    rows = benchmark.compare(benchmark.load_json(args.baseline), benchmark.load_json(args.current), args.threshold, args.metric)
+    regressed = 0
+    for (curve, scheme, policy_size, attr_size, operation), old, new, ratio, worse in rows:
+        regressed += worse
+        print('{:<8}{:<12}{:>6}{:>6}  {:<8}{:>12.3f}{:>12.3f}{:>9.2f}x{}'.format(
+            curve, scheme, policy_size, attr_size, operation, old, new, ratio, '  REGRESSION' if worse else ''))
+    print('%d of %d operations regressed by more than %.0f%%' % (regressed, len(rows), args.threshold * 100))
+    return 1 if regressed else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmark', description='Benchmark the ABS schemes.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='run the benchmarks on one curve')
+    run_parser.add_argument('--curve', default='BN254')
+    matrix_parser = commands.add_parser('matrix', help='run the benchmarks on several curves, each in its own process')
+    matrix_parser.add_argument('--curves', nargs='+', default=benchmark.available_curves())
+    for sub_parser in (run_parser, matrix_parser):
+        sub_parser.add_argument('--schemes', nargs='+', default=list(benchmark.SCHEMES), choices=list(benchmark.SCHEMES))
+        sub_parser.add_argument('--policy-sizes', nargs='+', type=int, default=[10, 20, 30, 40, 50])
+        sub_parser.add_argument('--attr-sizes', nargs='+', type=int, default=[10])
+        sub_parser.add_argument('--universe-size', type=int, default=100)
+        sub_parser.add_argument('--iterations', type=int, default=10)
+        sub_parser.add_argument('--warmup', type=int, default=2)
+        sub_parser.add_argument('--setup-iterations', type=int, default=None, help='defaults to --iterations')
+        sub_parser.add_argument('--json', help='write the records to this JSON file')
+        sub_parser.add_argument('--csv', help='write the records to this CSV file')
+    run_parser.set_defaults(func=run)
+    matrix_parser.set_defaults(func=matrix)
+
+    compare_parser = commands.add_parser('compare', help='compare a run against a saved baseline')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=0.10, help='relative slowdown reported as a regression')
+    compare_parser.add_argument('--metric', default='median_ms', choices=['median_ms', 'p95_ms', 'mean_ms', 'min_ms'])
+    compare_parser.set_defaults(func=compare)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
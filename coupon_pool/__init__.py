@@ -0,0 +1,106 @@
+"""
+Pools of signing coupons for offline/online signing.
+A coupon holds the randomness of one signature together with every value derived from it that
+does not depend on the message or the policy (e.g., the GT exponentiations of FABS). Coupons are
+computed ahead of time in the offline phase (e.g., during idle time, from another thread) and an
+online sign call takes exactly one of them, so a coupon is never used twice.
+It provides the following classes:
+- CouponPool: bounded thread-safe pool of coupons built by a factory function;
+- CouponPools: one CouponPool per secret key, created on first use, for at most max_pools keys.
+"""
+
+from collections import OrderedDict, deque
+import threading
+
+
+class CouponPool:
+    def __init__(self, factory, max_size=64):
+        assert max_size > 0, "pool size must be positive"
+        self.factory = factory
+        self.max_size = max_size
+        self._coupons = deque()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._coupons)
+
+    def fill(self, count=None):
+        """
+        Add up to count coupons (by default as many as fit) without exceeding max_size.
+        Coupons are computed outside the lock, so signing threads are not blocked meanwhile.
+        Return the number of coupons added.
+        """
+
+        if count is None:
+            count = self.max_size
+        added = 0
+        while added < count and len(self._coupons) < self.max_size:
+            coupon = self.factory()
+            with self._lock:
+                if len(self._coupons) >= self.max_size:
+                    break
+                self._coupons.append(coupon)
+            added += 1
+        return added
+
+    def take(self):
+        """
+        Remove and return one coupon. If the pool is empty the coupon is computed on the spot.
+        """
+
+        with self._lock:
+            if self._coupons:
+                return self._coupons.popleft()
+        return self.factory()
+
+    def clear(self):
+        with self._lock:
+            self._coupons.clear()
+
+
+class CouponPools:
+    """
+    CouponPool of every secret key, keyed by the key object itself.
+    Each pool keeps a reference to its key, so the key identity cannot be reused while the pool exists.
+    Pools are kept for the max_pools most recently used keys, the least recently used pool (and its
+    coupons) being dropped first; callers should still discard the pool of a key they no longer use,
+    so that neither the key nor its coupons stay reachable.
+    """
+
+    def __init__(self, max_size=64, max_pools=16):
+        assert max_pools > 0, "number of pools must be positive"
+        self.max_size = max_size
+        self.max_pools = max_pools
+        self._pools = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._pools)
+
+    def get(self, sk):
+        with self._lock:
+            entry = self._pools.get(id(sk))
+            if entry is None:
+                return None
+            self._pools.move_to_end(id(sk))
+            return entry[1]
+
+    def get_or_create(self, sk, factory, max_size=None):
+        with self._lock:
+            entry = self._pools.get(id(sk))
+            if entry is None:
+                entry = (sk, CouponPool(factory, max_size or self.max_size))
+                self._pools[id(sk)] = entry
+                while len(self._pools) > self.max_pools:
+                    self._pools.popitem(last=False)
+            else:
+                self._pools.move_to_end(id(sk))
+            return entry[1]
+
+    def discard(self, sk):
+        with self._lock:
+            self._pools.pop(id(sk), None)
+
+    def clear(self):
+        with self._lock:
+            self._pools.clear()
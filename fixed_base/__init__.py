@@ -0,0 +1,48 @@
+"""
+Fixed-base exponentiation tables for long-lived group elements.
+Charm keeps a windowed pre-processing table on an element once initPP() has been called on it,
+and every later exponentiation of that element (g ** x) uses the table automatically.
+The tables live on the element objects themselves: they are lost when an mpk is serialized or
+copied, so precompute has to be run again on the deserialized mpk.
+It provides the following functions:
+- precompute: build the tables for the given entries (elements or lists of elements) of a key;
+- is_precomputed: check whether an element already carries a table;
+- digit_table: the powers elem^0..elem^9 of an element, so that raising it to a decimal digit
+    is a lookup (used for the Waters hash of RD16, whose exponents are single digits).
+"""
+
+
+def is_precomputed(elem):
+    return bool(getattr(elem, 'preproc', False))
+
+
+def _init_table(elem):
+    if not is_precomputed(elem):
+        elem.initPP()
+
+
+def digit_table(elem, digits=10):
+    """
+    Return [1, elem, elem^2, ..., elem^(digits-1)], built with one multiplication per entry.
+    """
+
+    table = [1, elem]
+    for _ in range(2, digits):
+        table.append(table[-1] * elem)
+    return table
+
+
+def precompute(key, names):
+    """
+    Build fixed-base tables for key[name] for every name in names.
+    Entries that are lists (e.g., the V generators of RD16) get a table per element.
+    """
+
+    for name in names:
+        value = key[name]
+        if isinstance(value, (list, tuple)):
+            for elem in value:
+                _init_table(elem)
+        else:
+            _init_table(value)
+    return key
@@ -0,0 +1,203 @@
+"""
+Opt-in operation counting for the ABS schemes.
+An InstrumentedGroup wraps a PairingGroup and is given to a scheme in its place. Every element it
+hands out is a CountedElement, which forwards to the charm element and counts, per group
+(ZR, G1, G2, GT), the multiplications, divisions, inversions and exponentiations done on it.
+The group itself counts
+- pairings and final exponentiations: pair costs one of each, a pairing product of n pairs costs
+    n pairings and a single final exponentiation;
+- hashes into every group and random elements.
+instrument(scheme) then records the counts of every call of setup, keygen, sign and verify
+(and verify_batch) of a scheme built on an InstrumentedGroup.
+Nothing is wrapped unless a scheme is built on an InstrumentedGroup, so the schemes run on plain
+charm elements, without any overhead, otherwise.
+"""
+
+from collections import Counter
+import functools
+
+from charm.toolbox.pairinggroup import ZR, G1, G2, GT, pair
+
+TYPE_NAMES = {ZR: 'ZR', G1: 'G1', G2: 'G2', GT: 'GT'}
+
+METHODS = ['setup', 'keygen', 'sign', 'verify', 'verify_batch']
+
+
+def _raw(value):
+    return value.element if isinstance(value, CountedElement) else value
+
+
+class CountedElement:
+    """
+    Group element that counts the operations done on it. The charm element is kept in element.
+    """
+
+    __slots__ = ('element', 'counts')
+
+    def __init__(self, element, counts):
+        self.element = element
+        self.counts = counts
+
+    def _count(self, operation):
+        self.counts['%s_%s' % (operation, TYPE_NAMES.get(self.element.type, self.element.type))] += 1
+
+    def _wrap(self, element):
+        return CountedElement(element, self.counts) if not isinstance(element, (bool, int)) else element
+
+    # Type, pre-processing and initialization status of the underlying element
+    @property
+    def type(self):
+        return self.element.type
+
+    @property
+    def preproc(self):
+        return self.element.preproc
+
+    @property
+    def initialized(self):
+        return self.element.initialized
+
+    def initPP(self):
+        return self.element.initPP()
+
+    def __mul__(self, other):
+        self._count('mul')
+        return self._wrap(self.element * _raw(other))
+
+    def __rmul__(self, other):
+        self._count('mul')
+        return self._wrap(_raw(other) * self.element)
+
+    def __truediv__(self, other):
+        self._count('div')
+        return self._wrap(self.element / _raw(other))
+
+    def __rtruediv__(self, other):
+        self._count('div')
+        return self._wrap(_raw(other) / self.element)
+
+    def __pow__(self, exponent):
+        exponent = _raw(exponent)
+        self._count('inv' if isinstance(exponent, int) and exponent == -1 else 'exp')
+        return self._wrap(self.element ** exponent)
+
+    def __add__(self, other):
+        self._count('add')
+        return self._wrap(self.element + _raw(other))
+
+    def __radd__(self, other):
+        self._count('add')
+        return self._wrap(_raw(other) + self.element)
+
+    def __sub__(self, other):
+        self._count('sub')
+        return self._wrap(self.element - _raw(other))
+
+    def __rsub__(self, other):
+        self._count('sub')
+        return self._wrap(_raw(other) - self.element)
+
+    def __neg__(self):
+        return self._wrap(-self.element)
+
+    def __eq__(self, other):
+        return self.element == _raw(other)
+
+    def __ne__(self, other):
+        return self.element != _raw(other)
+
+    def __hash__(self):
+        return hash(self.element)
+
+    def __int__(self):
+        return int(self.element)
+
+    def __str__(self):
+        return str(self.element)
+
+    def __repr__(self):
+        return repr(self.element)
+
+
+class InstrumentedGroup:
+    """
+    Wrapper of a PairingGroup whose elements count their operations into counts.
+    Methods that are not wrapped are forwarded to the PairingGroup.
+    """
+
+    def __init__(self, group):
+        self.group = group
+        self.counts = Counter()
+
+    def __getattr__(self, name):
+        return getattr(self.group, name)
+
+    def _wrap(self, element):
+        return CountedElement(element, self.counts)
+
+    def reset(self):
+        self.counts.clear()
+
+    def snapshot(self):
+        return dict(self.counts)
+
+    def random(self, _type=ZR, count=1, seed=None):
+        self.counts['random_%s' % TYPE_NAMES[_type]] += count
+        result = self.group.random(_type, count, seed)
+        return tuple(self._wrap(e) for e in result) if count > 1 else self._wrap(result)
+
+    def init(self, _type, value=None):
+        return self._wrap(self.group.init(_type, value) if value is not None else self.group.init(_type))
+
+    def hash(self, args, _type=ZR):
+        self.counts['hash_%s' % TYPE_NAMES[_type]] += 1
+        if isinstance(args, (tuple, list)):
+            args = type(args)(_raw(arg) for arg in args)
+        return self._wrap(self.group.hash(_raw(args), _type))
+
+    def serialize(self, obj, compression=True):
+        return self.group.serialize(_raw(obj), compression)
+
+    def deserialize(self, obj, compression=True):
+        return self._wrap(self.group.deserialize(obj, compression))
+
+    def ismember(self, obj):
+        return self.group.ismember(_raw(obj))
+
+    def pair(self, lhs, rhs):
+        self.counts['pair'] += 1
+        self.counts['final_exp'] += 1
+        return self._wrap(pair(_raw(lhs), _raw(rhs)))
+
+    def pair_prod(self, lhs, rhs):
+        self.counts['pair'] += len(lhs)
+        self.counts['final_exp'] += 1
+        return self._wrap(self.group.pair_prod([_raw(e) for e in lhs], [_raw(e) for e in rhs]))
+
+
+def instrument(scheme):
+    """
+    Record the operation counts of every setup, keygen, sign, verify and verify_batch call of a scheme
+    built on an InstrumentedGroup. The records are appended to scheme.op_counts as (method, counts) pairs.
+    """
+
+    group = scheme.group
+    assert isinstance(group, InstrumentedGroup), "the scheme must be built on an InstrumentedGroup"
+    scheme.op_counts = []
+
+    def wrap(name, method):
+        @functools.wraps(method)
+        def counted(*args, **kwargs):
+            before = Counter(group.counts)
+            try:
+                return method(*args, **kwargs)
+            finally:
+                counts = Counter(group.counts)
+                counts.subtract(before)
+                scheme.op_counts.append((name, {key: value for key, value in counts.items() if value}))
+        return counted
+
+    for name in METHODS:
+        if hasattr(scheme, name):
+            setattr(scheme, name, wrap(name, getattr(scheme, name)))
+    return scheme
@@ -1,23 +1,575 @@
 """
 This class is adapted from the SecretUtil class in charm/toolbox/secretutil.py.
 It provides the following methods:
-- createPolicy: convert a Boolean formula encoded as a string into a policy represented like a tree;
-- convertPolicyToMSP: convert a policy into a monotone span program (MSP);
+- createPolicy: convert a Boolean formula encoded as a string into a policy represented like a tree,
+    where threshold gates are written 'k of (p_1, ..., p_n)', and normalize it (normalize_policy);
+- compile_policy: createPolicy followed by convertPolicyToMSP, memoised in a bounded LRU cache,
+    optionally returning the MSP in sparse form (SparseMSP), whose matrix attribute is an
+    int8 NumPy form of the MSP (MSPMatrix) that computes all row shares at once;
+- convertPolicyToMSP: convert a policy into a monotone span program (MSP) without recursion (build_msp);
+    a k-of-n threshold gate takes k-1 columns, its i-th child getting the powers i, i^2, ..., i^(k-1) in them;
 - getCoefficients: given a policy, returns a coefficient for every attribute;
+- reconstruction_coefficients: the coefficients of the selected rows whose combination gives the
+    target vector, for the rows that are not simply added (i.e., below threshold gates);
 - strip_index: remove the index from an attribute (i.e., x_y -> x);
 - prune: determine whether a given set of attributes satisfies the policy
     (returns false if it doesn't, otherwise a good enough subset of attributes);
+- prune_min_cost: like prune, but returns a satisfying subset of minimum size (or weight);
 - getAttributeList: retrieve the attributes that occur in a policy tree in order (left to right).
 """
 
+from collections import OrderedDict
+from fractions import Fraction
+import threading
+
+import numpy as np
+from pyparsing import Forward, Group, Literal, Optional, ParseException, Suppress, Word, ZeroOrMore, alphanums, nums
+
 from charm.core.math.pairing import ZR
+from charm.toolbox import policytree
 from charm.toolbox.policytree import *
 
 
+class ThresholdNode(BinNode):
+    """
+    Policy gate satisfied when at least threshold of its children are. Unlike the binary AND and OR
+    nodes, it keeps its children in a list (children), in the order they were written.
+    """
+
+    def __init__(self, threshold, children):
+        BinNode.__init__(self, OpType.THRESHOLD)
+        self.threshold = threshold
+        self.children = children
+
+    def __str__(self):
+        return '%d of (%s)' % (self.threshold, ', '.join(str(child) for child in self.children))
+
+
+def _children(node):
+    # Children of a gate, left to right
+    if node.getNodeType() == OpType.THRESHOLD:
+        return node.children
+    return [node.getLeft(), node.getRight()]
+
+
+def has_threshold(policy):
+    # Whether the policy tree contains a threshold gate
+    stack = [policy]
+    while stack:
+        node = stack.pop()
+        if node.getNodeType() == OpType.THRESHOLD:
+            return True
+        if node.getNodeType() != OpType.ATTR:
+            stack.extend(_children(node))
+    return False
+
+
+def _parse_action(element, action):
+    # pyparsing 3 renamed setParseAction to set_parse_action
+    if hasattr(element, 'set_parse_action'):
+        return element.set_parse_action(action)
+    return element.setParseAction(action)
+
+
+def _push_threshold(s, loc, toks):
+    # The children have already been pushed by their own parse actions; push the gate after them
+    policytree.objStack.append(('of', int(toks[0]), len(toks) - 1))
+
+
+class ThresholdPolicyParser(PolicyParser):
+    """
+    The policy parser of charm extended with threshold gates 'k of (p_1, ..., p_n)', where p_1, ..., p_n
+    are policies. Everything else is parsed as by charm, except that the whole string must be a policy:
+    trailing text, e.g., of a threshold gate missing its closing parenthesis, raises a ValueError
+    instead of being dropped.
+    """
+
+    def parse(self, string):
+        del policytree.objStack[:]
+        try:
+            # pyparsing 3 renamed parseString to parse_string
+            if hasattr(self.finalPol, 'parse_string'):
+                self.finalPol.parse_string(string, parse_all=True)
+            else:
+                self.finalPol.parseString(string, parseAll=True)
+        except ParseException as err:
+            raise ValueError("invalid policy %r: cannot parse the text from character %d on" % (string, err.loc)) from None
+        return self.evalStack(policytree.objStack)
+
+    def getBNF(self):
+        OperatorOR = _parse_action(Literal("OR"), policytree.downcaseTokens) | Literal("or")
+        OperatorAND = _parse_action(Literal("AND"), policytree.downcaseTokens) | Literal("and")
+        Operator = OperatorAND | OperatorOR
+        lpar = Literal("(").suppress()
+        rpar = Literal(")").suppress()
+
+        BinOperator = Literal("<=") | Literal(">=") | Literal("==") | Word("<>", max=1)
+
+        leafNode = _parse_action(Optional("!") + Word(alphanums + '-_./\\?!@#$^&*%'), policytree.createAttribute)
+        leafConditional = _parse_action(Word(alphanums) + BinOperator + Word(nums), policytree.parseNumConditional)
+        node = leafConditional | leafNode
+
+        expr = Forward()
+        threshold = Word(nums) + Suppress(Literal("of") | Literal("OF")) + lpar + Group(expr) + ZeroOrMore(Suppress(",") + Group(expr)) + rpar
+        atom = _parse_action(threshold, _push_threshold) | lpar + expr + rpar | _parse_action(node, policytree.pushFirst)
+        expr <<= atom + ZeroOrMore(_parse_action(Operator + atom, policytree.pushFirst))
+        return expr
+
+    def evalStack(self, stack):
+        # Evaluate the postfix stack front to back, so long chains of gates need no recursion
+        nodes = []
+        for op in stack:
+            if isinstance(op, tuple):
+                _, threshold, count = op
+                gate_children = nodes[len(nodes) - count:]
+                del nodes[len(nodes) - count:]
+                nodes.append(ThresholdNode(threshold, gate_children))
+            elif isinstance(op, str):
+                right = nodes.pop()
+                nodes.append(policytree.createTree(op, nodes.pop(), right))
+            else:
+                nodes.append(op)
+        del stack[:]
+        return nodes.pop()
+
+
+def _gate(node_type, items):
+    # Binary tree of the gate over items, nested to the right like the chain (a and (b and c))
+    node = items[-1]
+    for item in reversed(items[:-1]):
+        gate = BinNode(node_type)
+        gate.addSubNode(item, node)
+        node = gate
+    return node
+
+
+def normalize_policy(policy):
+    """
+    Simplify a policy tree before its conversion into an MSP:
+    - nested gates of the same type are flattened, e.g., ((a and b) and c) into the chain (a and (b and c)),
+        which gives every row at most two nonzero entries in the columns of the chain;
+    - repeated children of AND and OR gates (identical subtrees) are kept once;
+    - gates left with a single child are replaced by the child, 1-of-n thresholds become OR gates
+        and n-of-n thresholds AND gates, which need no entries other than 0, 1 and -1.
+    The tree is walked with explicit stacks, in time linear in its size, and a new tree is returned
+    (the leaves are reused).
+    """
+
+    # Every subtree is reduced to a form (type, parts, None) for an AND or OR gate whose children
+    # (parts) are not gathered yet, or (None, node, key) for a subtree that has been built, where key
+    # is a number identifying the subtree: equal subtrees get the same key. The items of every gate
+    # built so far are kept by key (gates), so the gate can still be spliced into a parent of its type
+    reduced = {}
+    keys = {}
+    gates = {}
+    stack = [(policy, False)]
+    while stack:
+        node, visited = stack.pop()
+        node_type = node.getNodeType()
+        if node_type == OpType.ATTR:
+            reduced[id(node)] = (None, node, keys.setdefault(str(node), len(keys)))
+            continue
+        if not visited:
+            stack.append((node, True))
+            for child in reversed(_children(node)):
+                stack.append((child, False))
+            continue
+
+        child_forms = [reduced.pop(id(child)) for child in _children(node)]
+        threshold = node.threshold if node_type == OpType.THRESHOLD else None
+        if threshold is not None:
+            assert 1 <= threshold <= len(child_forms), "invalid threshold %d of %d" % (threshold, len(child_forms))
+            if threshold == len(child_forms):
+                node_type, threshold = OpType.AND, None
+            elif threshold == 1:
+                node_type, threshold = OpType.OR, None
+
+        if threshold is not None:
+            items = [_build(form, keys, gates) for form in child_forms]
+            key = keys.setdefault(('of', threshold) + tuple(key for _, key in items), len(keys))
+            reduced[id(node)] = (None, ThresholdNode(threshold, [item for item, _ in items]), key)
+        else:
+            # Gates of the same type below are spliced in when the gate is built, including built gates
+            # of that type, e.g., an OR gate whose repeated children collapsed into one AND gate
+            parts = []
+            for form in child_forms:
+                if form[0] is None or form[0] != node_type:
+                    form = (None,) + _build(form, keys, gates)
+                    gate = gates.get(form[2])
+                    if gate is not None and gate[0] == node_type:
+                        form = (node_type, gate[1], None)
+                parts.append(form)
+            reduced[id(node)] = (node_type, parts, None)
+
+    return _build(reduced[id(policy)], keys, gates)[0]
+
+
+def _build(form, keys, gates):
+    """
+    Return the node and the key of a reduced subtree of normalize_policy. The children of an AND or OR
+    gate are gathered from the gates of the same type below it, left to right, repeated subtrees
+    are dropped and the gate is built as a chain, whose items are recorded in gates.
+    """
+
+    node_type, parts, key = form
+    if node_type is None:
+        return parts, key
+
+    items, seen = [], set()
+    stack = [iter(parts)]
+    while stack:
+        part = next(stack[-1], None)
+        if part is None:
+            stack.pop()
+        elif part[0] is not None:
+            stack.append(iter(part[1]))
+        elif part[2] not in seen:
+            seen.add(part[2])
+            items.append(part)
+    if len(items) == 1:
+        return items[0][1], items[0][2]
+    op = 'and' if node_type == OpType.AND else 'or'
+    key = keys.setdefault((op,) + tuple(item[2] for item in items), len(keys))
+    gates[key] = (node_type, items)
+    return _gate(node_type, [item[1] for item in items]), key
+
+
+def label_duplicates(policy):
+    """
+    Give the leaves of an attribute occurring more than once the indices 0, 1, ... (left to right),
+    so that every leaf, i.e., every MSP row, has its own label (x -> x_0, x_1, ...).
+    """
+
+    leaves = []
+    stack = [policy]
+    while stack:
+        node = stack.pop()
+        if node.getNodeType() == OpType.ATTR:
+            leaves.append(node)
+        else:
+            stack.extend(reversed(_children(node)))
+
+    counts = {}
+    for leaf in leaves:
+        counts[leaf.getAttribute()] = counts.get(leaf.getAttribute(), 0) + 1
+    labels = {}
+    for leaf in leaves:
+        attr = leaf.getAttribute()
+        if counts[attr] > 1:
+            leaf.index = labels.get(attr, 0)
+            labels[attr] = leaf.index + 1
+
+
+def min_cost_prune(policy, attributes, weights=None):
+    """
+    Return the leaves of a minimum-weight satisfying subset of the policy tree as a list of nodes
+    (left to right), or False if the attributes do not satisfy the policy.
+    The cost of every subtree is computed once, bottom-up: a leaf costs its weight if its attribute
+    is held (infinite otherwise), an AND gate the sum of its children, an OR gate the cheaper
+    child (the left one on ties, as prune does) and a k-of-n threshold gate its k cheapest children.
+    The tree is walked with explicit stacks, so the running time is linear in its size (up to the
+    sorting of the children of threshold gates).
+    """
+
+    attributes = set(attributes)
+    inf = float('inf')
+    cost = {}
+
+    cheapest = {}
+
+    # Post-order traversal computing the cost of every node
+    stack = [(policy, False)]
+    while stack:
+        node, visited = stack.pop()
+        node_type = node.getNodeType()
+        if node_type == OpType.ATTR:
+            attr = node.getAttribute()
+            cost[id(node)] = (weights.get(attr, 1) if weights else 1) if attr in attributes else inf
+        elif not visited:
+            stack.append((node, True))
+            for child in reversed(_children(node)):
+                stack.append((child, False))
+        elif node_type == OpType.THRESHOLD:
+            # The k cheapest children, the leftmost ones on ties
+            chosen = sorted(node.children, key=lambda child: cost[id(child)])[:node.threshold]
+            cheapest[id(node)] = set(id(child) for child in chosen)
+            cost[id(node)] = sum(cost[id(child)] for child in chosen)
+        elif node_type == OpType.AND:
+            cost[id(node)] = cost[id(node.getLeft())] + cost[id(node.getRight())]
+        else:
+            cost[id(node)] = min(cost[id(node.getLeft())], cost[id(node.getRight())])
+
+    if cost[id(policy)] == inf:
+        return False
+
+    # Follow the cheapest choices from the root to collect the selected leaves
+    nodes = []
+    stack = [policy]
+    while stack:
+        node = stack.pop()
+        node_type = node.getNodeType()
+        if node_type == OpType.ATTR:
+            nodes.append(node)
+        elif node_type == OpType.THRESHOLD:
+            stack.extend(child for child in reversed(node.children) if id(child) in cheapest[id(node)])
+        elif node_type == OpType.AND:
+            stack.append(node.getRight())
+            stack.append(node.getLeft())
+        elif cost[id(node.getLeft())] <= cost[id(node.getRight())]:
+            stack.append(node.getLeft())
+        else:
+            stack.append(node.getRight())
+    return nodes
+
+
+def threshold_coefficients(policy, nodes):
+    """
+    Given the leaves selected by min_cost_prune, return the rational coefficient of every selected leaf
+    that lies below a threshold gate, keyed by its label (attribute and index). The rows of the MSP
+    of the selected leaves, each multiplied by its coefficient (1 for the leaves left out), add up to the
+    target vector (1, 0, ..., 0). The coefficient of a leaf is the product, over its threshold ancestors,
+    of the Lagrange coefficient at 0 of the position of its branch among the selected children.
+    """
+
+    selected = set(id(node) for node in nodes)
+    # Post-order pass marking the subtrees that contain a selected leaf
+    used = set()
+    stack = [(policy, False)]
+    while stack:
+        node, visited = stack.pop()
+        if node.getNodeType() == OpType.ATTR:
+            if id(node) in selected:
+                used.add(id(node))
+        elif not visited:
+            stack.append((node, True))
+            stack.extend((child, False) for child in _children(node))
+        elif any(id(child) in used for child in _children(node)):
+            used.add(id(node))
+
+    coefficients = {}
+    stack = [(policy, None)]
+    while stack:
+        node, coeff = stack.pop()
+        node_type = node.getNodeType()
+        if node_type == OpType.ATTR:
+            if coeff is not None and id(node) in selected:
+                coefficients[node.getAttributeAndIndex()] = coeff
+        elif node_type == OpType.THRESHOLD:
+            points = [x for x, child in enumerate(node.children, 1) if id(child) in used]
+            assert len(points) == node.threshold, "the selection does not satisfy the threshold gate exactly"
+            for x in points:
+                lagrange = Fraction(1)
+                for y in points:
+                    if y != x:
+                        lagrange *= Fraction(y, y - x)
+                stack.append((node.children[x - 1], lagrange if coeff is None else coeff * lagrange))
+        else:
+            stack.extend((child, coeff) for child in _children(node) if id(child) in used)
+    return coefficients
+
+
+def build_msp(policy):
+    """
+    Convert a policy tree into an MSP, returned as the dictionary of (attribute, row) pairs
+    (rows left to right) and the number of columns. Starting from the vector [1] at the root:
+    - an OR gate gives its vector to both children;
+    - an AND gate appends a new column, the left child getting its vector followed by 1 there
+        and the right child -1 there (zeroes elsewhere);
+    - a k-of-n threshold gate appends k-1 new columns, its x-th child getting its vector followed
+        by x, x^2, ..., x^(k-1) there, so any k children span its vector (Vandermonde rows).
+    Rows are only as long as the number of columns when they are created. The tree is walked
+    depth-first with an explicit stack, so deep policies do not hit the recursion limit, and every
+    vector is built once, in time linear in the size of the MSP.
+    """
+
+    rows = {}
+    num_cols = 1
+    stack = [(policy, [1])]
+    while stack:
+        node, vector = stack.pop()
+        node_type = node.getNodeType()
+        if node_type == OpType.ATTR:
+            rows[node.getAttributeAndIndex()] = vector
+        elif node_type == OpType.OR:
+            stack.append((node.getRight(), vector))
+            stack.append((node.getLeft(), vector))
+        elif node_type == OpType.AND:
+            left_vector = vector + [0] * (num_cols - len(vector)) + [1]
+            right_vector = [0] * num_cols + [-1]
+            num_cols += 1
+            stack.append((node.getRight(), right_vector))
+            stack.append((node.getLeft(), left_vector))
+        elif node_type == OpType.THRESHOLD:
+            padded = vector + [0] * (num_cols - len(vector))
+            num_cols += node.threshold - 1
+            for x in range(len(node.children), 0, -1):
+                stack.append((node.children[x - 1], padded + [x ** j for j in range(1, node.threshold)]))
+    return rows, num_cols
+
+
+class PolicyCache:
+    """
+    Bounded LRU cache of compiled policies keyed by the policy string.
+    Each entry holds the policy tree, the MSP row dictionary, the number of columns and,
+    once it has been requested, the sparse form of the MSP.
+    The cached trees and rows are shared between callers and must not be modified.
+    """
+
+    def __init__(self, max_size=1024):
+        assert max_size > 0, "cache size must be positive"
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, policy_string):
+        with self._lock:
+            entry = self._entries.get(policy_string)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(policy_string)
+            self.hits += 1
+            return entry
+
+    def put(self, policy_string, entry):
+        with self._lock:
+            self._entries[policy_string] = entry
+            self._entries.move_to_end(policy_string)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def resize(self, max_size):
+        assert max_size > 0, "cache size must be positive"
+        with self._lock:
+            self.max_size = max_size
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries), 'max_size': self.max_size}
+
+
+# Cache shared by every MSP instance that is not given its own
+policy_cache = PolicyCache()
+
+
+class MSPMatrix:
+    """
+    MSP stored as a compact NumPy matrix (int8 unless an entry does not fit; the powers of threshold
+    gates may need int64, or Python integers beyond that) together with the row index of every attribute.
+    """
+
+    def __init__(self, mono_span_prog, num_cols):
+        self.attributes = list(mono_span_prog.keys())
+        self.index = {attr: i for i, attr in enumerate(self.attributes)}
+        self.num_cols = num_cols
+        max_entry = max((abs(M_ij) for row in mono_span_prog.values() for M_ij in row), default=0)
+        if max_entry <= 127:
+            dtype = np.int8
+        elif max_entry < 2 ** 63:
+            dtype = np.int64
+        else:
+            dtype = object
+        self.matrix = np.zeros((len(self.attributes), num_cols), dtype=dtype)
+        for i, row in enumerate(mono_span_prog.values()):
+            self.matrix[i, :len(row)] = row
+
+        # Column indices of the +1 and -1 entries of every row, and any other nonzero entries
+        self._plus = [np.flatnonzero(row == 1).tolist() for row in self.matrix]
+        self._minus = [np.flatnonzero(row == -1).tolist() for row in self.matrix]
+        self._other = [[(int(j), int(row[j])) for j in np.flatnonzero(np.abs(row) > 1)] for row in self.matrix]
+
+    def shares(self, vector):
+        """
+        Compute M_i . vector for every row i and return them as a dictionary keyed by attribute.
+        Columns beyond the vector are ignored. Entries of +1 and -1 only need additions and
+        subtractions of the vector elements, so no multiplication is done for them.
+        """
+
+        len_vector = len(vector)
+        shares = {}
+        for attr, plus, minus, other in zip(self.attributes, self._plus, self._minus, self._other):
+            share = 0
+            for j in plus:
+                if j < len_vector:
+                    share = share + vector[j]
+            for j in minus:
+                if j < len_vector:
+                    share = share - vector[j]
+            for j, M_ij in other:
+                if j < len_vector:
+                    share = share + M_ij * vector[j]
+            shares[attr] = share
+        return shares
+
+
+class SparseMSP:
+    """
+    MSP that keeps only the nonzero entries of the matrix:
+    rows maps every attribute to its (column, value) pairs and columns[j] lists the (attribute, value)
+    pairs of column j, so loops cost the number of nonzero entries instead of rows x columns.
+    The row dictionary it was built from stays available as the dense view, and the matrix
+    attribute holds the MSPMatrix form, built on first use.
+    """
+
+    def __init__(self, mono_span_prog, num_cols):
+        self.dense = mono_span_prog
+        self.num_cols = num_cols
+        self._matrix = None
+        self.rows = {}
+        self.columns = [[] for _ in range(num_cols)]
+        for attr, row in mono_span_prog.items():
+            entries = [(j, M_ij) for j, M_ij in enumerate(row) if M_ij != 0]
+            self.rows[attr] = entries
+            for j, M_ij in entries:
+                self.columns[j].append((attr, M_ij))
+
+    @property
+    def matrix(self):
+        if self._matrix is None:
+            self._matrix = MSPMatrix(self.dense, self.num_cols)
+        return self._matrix
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __contains__(self, attr):
+        return attr in self.rows
+
+    def keys(self):
+        return self.rows.keys()
+
+    def items(self):
+        return self.rows.items()
+
+    def dot(self, attr, vector):
+        """
+        Inner product of the row of attr with vector; columns beyond the vector are ignored.
+        """
+
+        len_vector = len(vector)
+        return sum(M_ij * vector[j] for j, M_ij in self.rows[attr] if j < len_vector)
+
+
 class MSP:
-    def __init__(self, groupObj, verbose=True):
+    def __init__(self, groupObj, verbose=True, cache=None):
         self.len_longest_row = 1
         self.group = groupObj
+        self.cache = policy_cache if cache is None else cache
 
     def createPolicy(self, policy_string):
         """
@@ -26,63 +578,39 @@ class MSP:
 
         assert type(policy_string) is str, "invalid type for policy_string"
         #policy_string = str(policy_string)
-        parser = PolicyParser()
-        policy_obj = parser.parse(policy_string)
-        _dictCount, _dictLabel = {}, {}
-        parser.findDuplicates(policy_obj, _dictCount)
-        for i in _dictCount.keys():
-            if _dictCount[ i ] > 1: _dictLabel[ i ] = 0
-        parser.labelDuplicates(policy_obj, _dictLabel)
+        parser = ThresholdPolicyParser()
+        policy_obj = normalize_policy(parser.parse(policy_string))
+        label_duplicates(policy_obj)
         return policy_obj
 
-    def convert_policy_to_msp(self, tree):
+    def compile_policy(self, policy_string, sparse=False):
         """
-        Convert a policy into a monotone span program (MSP)
-        represented by a dictionary with (attribute, row) pairs
+        Convert a policy string into a policy tree and its MSP, reusing the cached result when
+        the same policy string has been compiled before. Returns (policy, msp, number of columns),
+        where msp is the row dictionary, or a SparseMSP if sparse is set.
         """
 
-        root_vector = [1]
-        # listOfAttributeRowPairs = {}
-        self.len_longest_row = 1
-        return self._convert_policy_to_msp(tree, root_vector)
+        entry = self.cache.get(policy_string)
+        if entry is None:
+            policy = self.createPolicy(policy_string)
+            mono_span_prog = self.convert_policy_to_msp(policy)
+            entry = [policy, mono_span_prog, self.len_longest_row, None]
+            self.cache.put(policy_string, entry)
+        self.len_longest_row = entry[2]
+        if sparse:
+            if entry[3] is None:
+                entry[3] = SparseMSP(entry[1], entry[2])
+            return entry[0], entry[3], entry[2]
+        return entry[0], entry[1], entry[2]
 
-    def _convert_policy_to_msp(self, subtree, curr_vector):
+    def convert_policy_to_msp(self, tree):
         """
-         Given a vector for the current node,
-         returns the vectors for its children in the form of a dictionary
+        Convert a policy into a monotone span program (MSP)
+        represented by a dictionary with (attribute, row) pairs
         """
 
-        if subtree is None:
-            return None
-
-        type = subtree.getNodeType()
-
-        if type == OpType.ATTR:
-            # print ('ATTR: ', subtree, subtree.getAttributeAndIndex(), currVector)
-            return {subtree.getAttributeAndIndex(): curr_vector}
-
-        if type == OpType.OR:
-            left_list = self._convert_policy_to_msp(subtree.getLeft(), curr_vector)
-            right_list = self._convert_policy_to_msp(subtree.getRight(), curr_vector)
-            # print ('OR l: ', leftList, 'r: ', rightList)
-            left_list.update(right_list)
-            return left_list
-
-        if type == OpType.AND:
-            length = len(curr_vector)
-            left_vector = curr_vector + [0] * (self.len_longest_row - length) + [1]
-            right_vector = [0] * self.len_longest_row + [-1]  # [0]*k creates a vector of k zeroes
-            # extendedVector = currVector + [0]*(self.lengthOfLongestRow-length)
-            # leftVector = extendedVector + [1]
-            # rightVector = extendedVector + [2]  # [0]*k creates a vector of k zeroes
-            self.len_longest_row += 1
-            left_list = self._convert_policy_to_msp(subtree.getLeft(), left_vector)
-            right_list = self._convert_policy_to_msp(subtree.getRight(), right_vector)
-            # print ('AND l: ', leftList, 'r: ', rightList)
-            left_list.update(right_list)
-            return left_list
-
-        return None
+        mono_span_prog, self.len_longest_row = build_msp(tree)
+        return mono_span_prog
 
     def getCoefficients(self, tree):
         """
@@ -149,9 +677,34 @@ class MSP:
         (returns false if it doesn't, otherwise a good enough subset of attributes).
         """
 
+        if has_threshold(policy):
+            # charm's pruning only knows AND and OR gates
+            return min_cost_prune(policy, attributes)
         parser = PolicyParser()
         return parser.prune(policy, attributes)
 
+    def prune_min_cost(self, policy, attributes, weights=None):
+        """
+        Determine whether a given set of attributes satisfies the policy
+        (returns false if it doesn't, otherwise a satisfying subset of minimum total weight,
+        where every attribute weighs weights[attribute], or 1 by default).
+        """
+
+        return min_cost_prune(policy, attributes, weights)
+
+    def reconstruction_coefficients(self, policy, nodes):
+        """
+        Given the leaves selected by prune_min_cost, return the coefficient (in ZR) of every selected row
+        that is not simply added to reconstruct the target vector, i.e., of the rows below threshold gates.
+        Rows left out have coefficient 1, so callers can skip their exponentiations.
+        """
+
+        coefficients = {}
+        for attr, coeff in threshold_coefficients(policy, nodes).items():
+            coeff_zr = self.group.init(ZR, abs(coeff.numerator)) / self.group.init(ZR, coeff.denominator)
+            coefficients[attr] = coeff_zr if coeff.numerator > 0 else 0 - coeff_zr
+        return coefficients
+
     def getAttributeList(self, Node):
         """
          Retrieve the attributes that occur in a policy tree in order (left to right).
@@ -167,6 +720,9 @@ class MSP:
         # V, L, R
         if (Node.getNodeType() == OpType.ATTR):
             List.append(Node.getAttributeAndIndex())  # .getAttribute()
+        elif (Node.getNodeType() == OpType.THRESHOLD):
+            for child in Node.children:
+                self._getAttributeList(child, List)
         else:
             self._getAttributeList(Node.getLeft(), List)
             self._getAttributeList(Node.getRight(), List)
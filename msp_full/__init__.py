@@ -1,23 +1,37 @@
 """
 This class is adapted from the SecretUtil class in charm/toolbox/secretutil.py.
 It provides the following methods:
-- createPolicy: convert a Boolean formula encoded as a string into a policy represented like a tree;
-- convertPolicyToMSP: convert a policy into a monotone span program (MSP);
+- createPolicy: convert a Boolean formula encoded as a string into a policy represented like a tree,
+    where threshold gates are written 'k of (p_1, ..., p_n)', and normalize it (see msp.normalize_policy);
+- compile_policy: createPolicy followed by convertPolicyToMSP, memoised in a bounded LRU cache,
+    optionally returning the MSP in sparse form (SparseMSP);
+- convertPolicyToMSP: convert a policy into a monotone span program (MSP) without recursion (build_msp);
+    a k-of-n threshold gate takes k-1 columns, its i-th child getting the powers i, i^2, ..., i^(k-1) in them;
 - getCoefficients: given a policy, returns a coefficient for every attribute;
+- reconstruction_coefficients: the coefficients of the selected rows whose combination gives the
+    target vector, for the rows that are not simply added (i.e., below threshold gates);
 - strip_index: remove the index from an attribute (i.e., x_y -> x);
 - prune: determine whether a given set of attributes satisfies the policy
     (returns false if it doesn't, otherwise a good enough subset of attributes);
+- prune_min_cost: like prune, but returns a satisfying subset of minimum size (or weight);
 - getAttributeList: retrieve the attributes that occur in a policy tree in order (left to right).
 """
 
 from charm.core.math.pairing import ZR
 from charm.toolbox.policytree import *
+from msp import (PolicyCache, SparseMSP, ThresholdPolicyParser, build_msp, has_threshold, label_duplicates,
+                 min_cost_prune, normalize_policy, threshold_coefficients)
+
+
+# Padded MSPs differ from those of msp, so they are kept in a separate cache
+policy_cache = PolicyCache()
 
 
 class MSP:
-    def __init__(self, groupObj, verbose=True):
+    def __init__(self, groupObj, verbose=True, cache=None):
         self.len_longest_row = 1
         self.group = groupObj
+        self.cache = policy_cache if cache is None else cache
 
     def createPolicy(self, policy_string):
         """
@@ -26,25 +40,38 @@ class MSP:
 
         assert type(policy_string) is str, "invalid type for policy_string"
         #policy_string = str(policy_string)
-        parser = PolicyParser()
-        policy_obj = parser.parse(policy_string)
-        _dictCount, _dictLabel = {}, {}
-        parser.findDuplicates(policy_obj, _dictCount)
-        for i in _dictCount.keys():
-            if _dictCount[ i ] > 1: _dictLabel[ i ] = 0
-        parser.labelDuplicates(policy_obj, _dictLabel)
+        parser = ThresholdPolicyParser()
+        policy_obj = normalize_policy(parser.parse(policy_string))
+        label_duplicates(policy_obj)
         return policy_obj
 
+    def compile_policy(self, policy_string, sparse=False):
+        """
+        Convert a policy string into a policy tree and its MSP, reusing the cached result when
+        the same policy string has been compiled before. Returns (policy, msp, number of columns),
+        where msp is the row dictionary, or a SparseMSP if sparse is set.
+        """
+
+        entry = self.cache.get(policy_string)
+        if entry is None:
+            policy = self.createPolicy(policy_string)
+            mono_span_prog = self.convert_policy_to_msp(policy)
+            entry = [policy, mono_span_prog, self.len_longest_row, None]
+            self.cache.put(policy_string, entry)
+        self.len_longest_row = entry[2]
+        if sparse:
+            if entry[3] is None:
+                entry[3] = SparseMSP(entry[1], entry[2])
+            return entry[0], entry[3], entry[2]
+        return entry[0], entry[1], entry[2]
+
     def convert_policy_to_msp(self, tree):
         """
         Convert a policy into a monotone span program (MSP)
         represented by a dictionary with (attribute, row) pairs
         """
 
-        root_vector = [1]
-        # listOfAttributeRowPairs = {}
-        self.len_longest_row = 1
-        msp = self._convert_policy_to_msp(tree, root_vector)
+        msp, self.len_longest_row = build_msp(tree)
         max_len = max(len(row) for row in msp.values())
         for k, v in msp.items():
             if len(v) < max_len:
@@ -52,44 +79,6 @@ class MSP:
         
         return msp
 
-    def _convert_policy_to_msp(self, subtree, curr_vector):
-        """
-         Given a vector for the current node,
-         returns the vectors for its children in the form of a dictionary
-        """
-
-        if subtree is None:
-            return None
-
-        type = subtree.getNodeType()
-
-        if type == OpType.ATTR:
-            # print ('ATTR: ', subtree, subtree.getAttributeAndIndex(), currVector)
-            return {subtree.getAttributeAndIndex(): curr_vector}
-
-        if type == OpType.OR:
-            left_list = self._convert_policy_to_msp(subtree.getLeft(), curr_vector)
-            right_list = self._convert_policy_to_msp(subtree.getRight(), curr_vector)
-            # print ('OR l: ', leftList, 'r: ', rightList)
-            left_list.update(right_list)
-            return left_list
-
-        if type == OpType.AND:
-            length = len(curr_vector)
-            left_vector = curr_vector + [0] * (self.len_longest_row - length) + [1]
-            right_vector = [0] * self.len_longest_row + [-1]  # [0]*k creates a vector of k zeroes
-            # extendedVector = currVector + [0]*(self.lengthOfLongestRow-length)
-            # leftVector = extendedVector + [1]
-            # rightVector = extendedVector + [2]  # [0]*k creates a vector of k zeroes
-            self.len_longest_row += 1
-            left_list = self._convert_policy_to_msp(subtree.getLeft(), left_vector)
-            right_list = self._convert_policy_to_msp(subtree.getRight(), right_vector)
-            # print ('AND l: ', leftList, 'r: ', rightList)
-            left_list.update(right_list)
-            return left_list
-
-        return None
-
     def getCoefficients(self, tree):
         """
         Given a policy, returns a coefficient for every attribute.
@@ -155,9 +144,34 @@ class MSP:
         (returns false if it doesn't, otherwise a good enough subset of attributes).
         """
 
+        if has_threshold(policy):
+            # charm's pruning only knows AND and OR gates
+            return min_cost_prune(policy, attributes)
         parser = PolicyParser()
         return parser.prune(policy, attributes)
 
+    def prune_min_cost(self, policy, attributes, weights=None):
+        """
+        Determine whether a given set of attributes satisfies the policy
+        (returns false if it doesn't, otherwise a satisfying subset of minimum total weight,
+        where every attribute weighs weights[attribute], or 1 by default).
+        """
+
+        return min_cost_prune(policy, attributes, weights)
+
+    def reconstruction_coefficients(self, policy, nodes):
+        """
+        Given the leaves selected by prune_min_cost, return the coefficient (in ZR) of every selected row
+        that is not simply added to reconstruct the target vector, i.e., of the rows below threshold gates.
+        Rows left out have coefficient 1, so callers can skip their exponentiations.
+        """
+
+        coefficients = {}
+        for attr, coeff in threshold_coefficients(policy, nodes).items():
+            coeff_zr = self.group.init(ZR, abs(coeff.numerator)) / self.group.init(ZR, coeff.denominator)
+            coefficients[attr] = coeff_zr if coeff.numerator > 0 else 0 - coeff_zr
+        return coefficients
+
     def getAttributeList(self, Node):
         """
          Retrieve the attributes that occur in a policy tree in order (left to right).
@@ -173,6 +187,9 @@ class MSP:
         # V, L, R
         if (Node.getNodeType() == OpType.ATTR):
             List.append(Node.getAttributeAndIndex())  # .getAttribute()
+        elif (Node.getNodeType() == OpType.THRESHOLD):
+            for child in Node.children:
+                self._getAttributeList(child, List)
         else:
             self._getAttributeList(Node.getLeft(), List)
             self._getAttributeList(Node.getRight(), List)
@@ -0,0 +1,130 @@
+"""
+Simultaneous multi-exponentiation for G1, G2 and GT elements.
+It provides the following functions:
+- multiexp: compute prod(bases[i] ** exponents[i]), picking Straus or Pippenger by input size;
+- straus: interleaved fixed-window method, best for a few bases;
+- pippenger: bucket method, best for many bases.
+Exponents may be ZR elements or Python integers. Zero exponents are skipped, negative integer
+exponents are applied to the inverse of their base, and bases that carry a fixed-base table
+(see fixed_base) are exponentiated directly so the table is used.
+An empty product is returned as the integer 1, which charm accepts as the identity in products.
+"""
+
+# Number of bases from which the bucket method beats the interleaved window method
+PIPPENGER_THRESHOLD = 32
+
+
+def _normalize(bases, exponents):
+    # Turn the exponents into non-negative integers and split off the bases with a fixed-base table
+    pairs, direct = [], None
+    for base, exp in zip(bases, exponents):
+        e = int(exp)
+        if e == 0:
+            continue
+        if getattr(base, 'preproc', False):
+            # charm only accepts -1 as a negative integer exponent
+            term = base ** e if e > 0 else (base ** -e) ** -1
+            direct = term if direct is None else direct * term
+            continue
+        if e < 0:
+            base, e = base ** -1, -e
+        pairs.append((base, e))
+    return pairs, direct
+
+
+def _straus_window(bits):
+    # Window minimising the table size plus the number of window multiplications per base
+    return min(range(1, 7), key=lambda w: (1 << w) + bits / w)
+
+
+def _pippenger_window(bits, n):
+    return min(range(1, 17), key=lambda c: -(-bits // c) * (n + (1 << (c + 1))))
+
+
+def _straus(pairs):
+    bits = max(e.bit_length() for _, e in pairs)
+    w = _straus_window(bits)
+    mask = (1 << w) - 1
+
+    # table[i][d - 1] = base_i ** d for every window value d
+    tables = []
+    for base, _ in pairs:
+        row = [base]
+        for _ in range(mask - 1):
+            row.append(row[-1] * base)
+        tables.append(row)
+
+    acc = None
+    for shift in range(((bits + w - 1) // w - 1) * w, -1, -w):
+        if acc is not None:
+            for _ in range(w):
+                acc = acc * acc
+        for (_, e), row in zip(pairs, tables):
+            d = (e >> shift) & mask
+            if d:
+                acc = row[d - 1] if acc is None else acc * row[d - 1]
+    return acc
+
+
+def _pippenger(pairs):
+    bits = max(e.bit_length() for _, e in pairs)
+    c = _pippenger_window(bits, len(pairs))
+    mask = (1 << c) - 1
+
+    acc = None
+    for shift in range(((bits + c - 1) // c - 1) * c, -1, -c):
+        if acc is not None:
+            for _ in range(c):
+                acc = acc * acc
+
+        # Put every base into the bucket of its window value
+        buckets = [None] * (mask + 1)
+        for base, e in pairs:
+            d = (e >> shift) & mask
+            if d:
+                buckets[d] = base if buckets[d] is None else buckets[d] * base
+
+        # sum_d bucket_d ** d, computed with running products from the highest bucket down
+        running, window_sum = None, None
+        for d in range(mask, 0, -1):
+            if buckets[d] is not None:
+                running = buckets[d] if running is None else running * buckets[d]
+            if running is not None:
+                window_sum = running if window_sum is None else window_sum * running
+        if window_sum is not None:
+            acc = window_sum if acc is None else acc * window_sum
+    return acc
+
+
+def _combine(result, direct):
+    if result is None:
+        return 1 if direct is None else direct
+    return result if direct is None else result * direct
+
+
+def straus(bases, exponents):
+    pairs, direct = _normalize(bases, exponents)
+    return _combine(_straus(pairs) if pairs else None, direct)
+
+
+def pippenger(bases, exponents):
+    pairs, direct = _normalize(bases, exponents)
+    return _combine(_pippenger(pairs) if pairs else None, direct)
+
+
+def multiexp(bases, exponents):
+    """
+    Compute prod(bases[i] ** exponents[i]) with a single shared chain of squarings.
+    """
+
+    pairs, direct = _normalize(bases, exponents)
+    if not pairs:
+        result = None
+    elif len(pairs) == 1:
+        base, e = pairs[0]
+        result = base ** e
+    elif len(pairs) < PIPPENGER_THRESHOLD:
+        result = _straus(pairs)
+    else:
+        result = _pippenger(pairs)
+    return _combine(result, direct)
@@ -0,0 +1,35 @@
+"""
+Products of pairings evaluated with a single final exponentiation.
+It provides the following functions:
+- pair_prod: compute prod e(lhs[i], rhs[i]); the Miller loops are evaluated separately but
+    their product goes through one shared final exponentiation (charm's PairingGroup.pair_prod);
+- pair_prod_equals: check whether such a product equals a target in GT (the identity by default);
+- group_pair: the single pairing function of a group, i.e., charm's pair, or the group's own pair
+    method for wrapped groups such as instrument.InstrumentedGroup.
+A quotient e(a, b) / e(c, d) is evaluated as the product e(a, b) * e(c ** -1, d).
+"""
+
+from charm.toolbox.pairinggroup import GT, pair
+
+
+def group_pair(group):
+    return getattr(group, 'pair', pair)
+
+
+def pair_prod(group, lhs, rhs):
+    assert len(lhs) == len(rhs), "pairing product needs as many G1 as G2 elements"
+    if not lhs:
+        return group.init(GT, 1)
+    if len(lhs) == 1:
+        return group_pair(group)(lhs[0], rhs[0])
+    return group.pair_prod(list(lhs), list(rhs))
+
+
+def pair_prod_equals(group, lhs, rhs, target=None):
+    """
+    Check prod e(lhs[i], rhs[i]) == target, where target defaults to the identity of GT.
+    """
+
+    if target is None:
+        target = group.init(GT, 1)
+    return pair_prod(group, lhs, rhs) == target
@@ -0,0 +1,96 @@
+"""
+Process-pool executor for signing and verifying with any of the ABS schemes.
+charm elements cannot be pickled and the pairing code runs on one core per process, so ParallelABS
+starts worker processes that each
+- build their own PairingGroup and scheme instance once;
+- receive the mpk and the secret keys once, in the wire format (see wire), and build the
+    fixed-base tables of the mpk;
+and then spreads sign/verify jobs across the workers. Signatures travel in the wire format as well;
+results are returned in the order of the jobs.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import os
+
+from charm.toolbox.pairinggroup import PairingGroup
+import wire
+
+# Per-process state of a worker, set by _init_worker
+_worker = {}
+
+
+def _init_worker(scheme_class, curve, mpk_bytes, key_bytes, precompute):
+    group = PairingGroup(curve)
+    scheme = scheme_class(group)
+    mpk = wire.materialize(wire.decode(group, mpk_bytes))
+    if precompute and hasattr(scheme, 'precompute'):
+        scheme.precompute(mpk)
+    keys = {key_id: wire.decode(group, data) for key_id, data in key_bytes.items()}
+    _worker.update(group=group, scheme=scheme, mpk=mpk, keys=keys)
+
+
+def _sign_job(job):
+    key_id, args, kwargs = job
+    signature = _worker['scheme'].sign(_worker['mpk'], _worker['keys'][key_id], *args, **kwargs)
+    return wire.encode(_worker['group'], signature)
+
+
+def _verify_job(job):
+    signature_bytes, args, kwargs = job
+    signature = wire.decode(_worker['group'], signature_bytes)
+    return bool(_worker['scheme'].verify(_worker['mpk'], signature, *args, **kwargs))
+
+
+class ParallelABS:
+    """
+    Parallel front-end of an ABS scheme class (e.g., FABS_KPABS) on a given curve.
+    keys maps a key identifier to a secret key; sign jobs refer to their key by identifier.
+    """
+
+    def __init__(self, scheme_class, curve, mpk, keys=None, workers=None, precompute=True, chunksize=None):
+        self.group = PairingGroup(curve)
+        self.workers = workers or os.cpu_count() or 1
+        self.chunksize = chunksize
+        key_bytes = {key_id: wire.encode(self.group, sk) for key_id, sk in (keys or {}).items()}
+        self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                             initargs=(scheme_class, curve, wire.encode(self.group, mpk), key_bytes, precompute))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+    def _chunksize(self, count):
+        # A few chunks per worker keep every worker busy without paying the IPC cost per job
+        if self.chunksize is not None:
+            return self.chunksize
+        return max(1, count // (4 * self.workers))
+
+    def sign_many(self, jobs, **kwargs):
+        """
+        Sign every (key_id, msg, policy_str, attr_list) job and return the signatures in order.
+        Keyword arguments (e.g., fs_version) are passed to every sign call.
+        """
+
+        jobs = [(job[0], tuple(job[1:]), kwargs) for job in jobs]
+        encoded = self._executor.map(_sign_job, jobs, chunksize=self._chunksize(len(jobs)))
+        return [wire.materialize(wire.decode(self.group, data)) for data in encoded]
+
+    def verify_many(self, items, **kwargs):
+        """
+        Verify every (signature, attr_list or policy_str, msg) item and return the results in order.
+        Keyword arguments (e.g., fs_version) are passed to every verify call.
+        """
+
+        jobs = [(wire.encode(self.group, item[0]), tuple(item[1:]), kwargs) for item in items]
+        return list(self._executor.map(_verify_job, jobs, chunksize=self._chunksize(len(jobs))))
+
+    def sign(self, key_id, msg, policy_str, attr_list, **kwargs):
+        return self.sign_many([(key_id, msg, policy_str, attr_list)], **kwargs)[0]
+
+    def verify(self, signature, attrs, msg, **kwargs):
+        return self.verify_many([(signature, attrs, msg)], **kwargs)[0]
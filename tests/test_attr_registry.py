@@ -0,0 +1,54 @@
+"""
+Tests of the attribute registry shared by the schemes.
+"""
+
+import unittest
+
+from charm.toolbox.pairinggroup import PairingGroup, ZR, G1
+
+from attr_registry import AttributeRegistry
+
+GROUP = PairingGroup('BN254')
+
+
+class TestAttributeRegistry(unittest.TestCase):
+    def test_strip_index(self):
+        registry = AttributeRegistry(GROUP)
+        self.assertEqual(registry.strip_index('ADMIN_1'), 'ADMIN')
+        self.assertEqual(registry.strip_index('ADMIN'), 'ADMIN')
+
+    def test_entries_are_interned(self):
+        registry = AttributeRegistry(GROUP)
+        entry = registry.lookup('A')
+        self.assertIs(registry.lookup('A'), entry)
+        self.assertNotEqual(registry.lookup('B').id, entry.id)
+        self.assertIn('A', registry)
+        self.assertEqual(len(registry), 2)
+
+    def test_hashes_are_cached(self):
+        registry = AttributeRegistry(GROUP)
+        self.assertEqual(registry.hash_g1('A'), GROUP.hash('A', G1))
+        self.assertIs(registry.hash_g1('A'), registry.hash_g1('A'))
+        self.assertEqual(registry.hash_zr('A'), GROUP.hash('A', ZR))
+
+    def test_eviction(self):
+        registry = AttributeRegistry(GROUP, max_entries=2)
+        registry.lookup('A')
+        registry.lookup('B')
+        registry.lookup('A')
+        registry.lookup('C')
+        self.assertEqual(len(registry), 2)
+        self.assertNotIn('B', registry)
+        self.assertIn('A', registry)
+
+    def test_prewarm(self):
+        registry = AttributeRegistry(GROUP)
+        registry.prewarm(['A', 'B'], zr=True)
+        self.assertIsNotNone(registry.lookup('A').hash_g1)
+        self.assertIsNotNone(registry.lookup('B').hash_zr)
+        registry.clear()
+        self.assertEqual(len(registry), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+"""
+Tests of the benchmark helpers that do not time anything: policies, statistics, result files and
+regression checks.
+"""
+
+import os
+import tempfile
+import unittest
+
+import benchmark
+
+
+def record(operation, median_ms, scheme='FABS_SPABS', policy_size=10):
+    return {'curve': 'BN254', 'scheme': scheme, 'policy_size': policy_size, 'attr_size': 10,
+            'operation': operation, 'median_ms': median_ms}
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_policy_and_attributes(self):
+        self.assertEqual(benchmark.policy_and_attributes(2, 4), ('(1 and 2) or (3 and 4)', ['1', '2']))
+        self.assertEqual(benchmark.policy_and_attributes(3, 3)[1], ['1', '2', '3'])
+
+    def test_summarize(self):
+        stats = benchmark.summarize([3000000, 1000000, 2000000])
+        self.assertEqual(stats['iterations'], 3)
+        self.assertAlmostEqual(stats['median_ms'], 2.0)
+        self.assertAlmostEqual(stats['min_ms'], 1.0)
+        self.assertAlmostEqual(stats['p95_ms'], 3.0)
+        self.assertEqual(benchmark.summarize([5])['stddev_ms'], 0.0)
+
+    def test_compare(self):
+        baseline = [record('sign', 1.0), record('verify', 2.0), record('keygen', 1.0, policy_size=20)]
+        current = [record('sign', 1.05), record('verify', 2.5), record('setup', 1.0)]
+        rows = benchmark.compare(baseline, current, threshold=0.10)
+        # Records present in only one of the runs are skipped
+        self.assertEqual([row[0][-1] for row in rows], ['sign', 'verify'])
+        self.assertEqual([row[4] for row in rows], [False, True])
+        self.assertAlmostEqual(rows[1][3], 1.25)
+
+    def test_result_files(self):
+        records = [record('sign', 1.0), dict(record('verify', 2.0), extra=1)]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'results.json')
+            benchmark.write_json(records, path)
+            self.assertEqual(benchmark.load_json(path), records)
+            csv_path = os.path.join(directory, 'results.csv')
+            benchmark.write_csv(records, csv_path)
+            with open(csv_path) as f:
+                header = f.readline().strip().split(',')
+            self.assertEqual(header[:len(benchmark.FIELDS)], benchmark.FIELDS)
+            self.assertEqual(header[-1], 'extra')
+
+    def test_matrix_table(self):
+        records = [dict(record(operation, ms), mpk_bytes=1, sk_bytes=2, sig_bytes=3)
+                   for operation, ms in (('setup', 1.0), ('sign', 2.0))]
+        rows = benchmark.matrix_table(records)
+        self.assertEqual(len(rows), 1)
+        self.assertEqual((rows[0]['setup_ms'], rows[0]['sign_ms'], rows[0]['sig_bytes']), (1.0, 2.0, 3))
+
+
+if __name__ == '__main__':
+    unittest.main()
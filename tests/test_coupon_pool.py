@@ -0,0 +1,66 @@
+"""
+Tests of the coupon pools of offline/online signing.
+"""
+
+import itertools
+import unittest
+
+from coupon_pool import CouponPool, CouponPools
+
+
+class TestCouponPool(unittest.TestCase):
+    def setUp(self):
+        self.pool = CouponPool(itertools.count().__next__, max_size=3)
+
+    def test_fill_is_bounded(self):
+        self.assertEqual(self.pool.fill(2), 2)
+        self.assertEqual(self.pool.fill(), 1)
+        self.assertEqual(self.pool.fill(), 0)
+        self.assertEqual(len(self.pool), 3)
+
+    def test_take_order(self):
+        self.pool.fill()
+        self.assertEqual([self.pool.take() for _ in range(3)], [0, 1, 2])
+        # An empty pool computes the coupon on the spot
+        self.assertEqual(self.pool.take(), 3)
+        self.assertEqual(len(self.pool), 0)
+
+    def test_clear(self):
+        self.pool.fill()
+        self.pool.clear()
+        self.assertEqual(len(self.pool), 0)
+
+
+class TestCouponPools(unittest.TestCase):
+    def test_one_pool_per_key(self):
+        pools = CouponPools(max_size=2)
+        sk_1, sk_2 = {'k': 1}, {'k': 1}
+        pool = pools.get_or_create(sk_1, lambda: 'coupon')
+        self.assertIs(pools.get_or_create(sk_1, lambda: 'other'), pool)
+        self.assertIs(pools.get(sk_1), pool)
+        self.assertIsNone(pools.get(sk_2))
+        self.assertEqual(pool.max_size, 2)
+
+    def test_least_recently_used_pool_is_dropped(self):
+        pools = CouponPools(max_pools=2)
+        keys = [{} for _ in range(3)]
+        pools.get_or_create(keys[0], lambda: 0)
+        pools.get_or_create(keys[1], lambda: 1)
+        pools.get(keys[0])
+        pools.get_or_create(keys[2], lambda: 2)
+        self.assertEqual(len(pools), 2)
+        self.assertIsNone(pools.get(keys[1]))
+        self.assertIsNotNone(pools.get(keys[0]))
+
+    def test_discard(self):
+        pools = CouponPools()
+        sk = {}
+        pools.get_or_create(sk, lambda: 0)
+        pools.discard(sk)
+        pools.discard(sk)
+        self.assertIsNone(pools.get(sk))
+        self.assertEqual(len(pools), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+"""
+Regression tests of the policy normalization and the iterative MSP builder of msp, against the
+recursive normalization and conversion they replaced.
+"""
+
+import random
+import unittest
+
+from charm.toolbox.node import OpType
+
+from msp import MSP, ThresholdNode, ThresholdPolicyParser, _children, _gate, label_duplicates
+
+
+def reference_normalize(policy):
+    # Recursive normalization: splice gates of the same type, drop repeated children, collapse single children
+    node_type = policy.getNodeType()
+    if node_type == OpType.ATTR:
+        return (OpType.ATTR, policy, str(policy))
+    forms = [reference_normalize(child) for child in _children(policy)]
+    threshold = policy.threshold if node_type == OpType.THRESHOLD else None
+    if threshold == len(forms):
+        node_type, threshold = OpType.AND, None
+    elif threshold == 1:
+        node_type, threshold = OpType.OR, None
+    if threshold is not None:
+        key = '%d of (%s)' % (threshold, ', '.join(form[2] for form in forms))
+        return (OpType.THRESHOLD, ThresholdNode(threshold, [reference_build(form) for form in forms]), key)
+
+    items, seen = [], set()
+    for form in forms:
+        for item in (form[1] if form[0] == node_type else [form]):
+            if item[2] not in seen:
+                seen.add(item[2])
+                items.append(item)
+    if len(items) == 1:
+        return items[0]
+    op = ' and ' if node_type == OpType.AND else ' or '
+    return (node_type, items, '(%s)' % op.join(item[2] for item in items))
+
+
+def reference_build(form):
+    node_type, value, _ = form
+    if node_type in (OpType.ATTR, OpType.THRESHOLD):
+        return value
+    return _gate(node_type, [reference_build(item) for item in value])
+
+
+def reference_msp(node, vector, num_cols):
+    # Recursive conversion; num_cols is a one-element list shared by the whole walk
+    node_type = node.getNodeType()
+    if node_type == OpType.ATTR:
+        return {node.getAttributeAndIndex(): vector}
+    rows = {}
+    if node_type == OpType.OR:
+        rows.update(reference_msp(node.getLeft(), vector, num_cols))
+        rows.update(reference_msp(node.getRight(), vector, num_cols))
+    elif node_type == OpType.AND:
+        left_vector = vector + [0] * (num_cols[0] - len(vector)) + [1]
+        right_vector = [0] * num_cols[0] + [-1]
+        num_cols[0] += 1
+        rows.update(reference_msp(node.getLeft(), left_vector, num_cols))
+        rows.update(reference_msp(node.getRight(), right_vector, num_cols))
+    else:
+        padded = vector + [0] * (num_cols[0] - len(vector))
+        num_cols[0] += node.threshold - 1
+        for x, child in enumerate(node.children, 1):
+            rows.update(reference_msp(child, padded + [x ** j for j in range(1, node.threshold)], num_cols))
+    return rows
+
+
+def reference_compile(policy_string):
+    policy = reference_build(reference_normalize(ThresholdPolicyParser().parse(policy_string)))
+    label_duplicates(policy)
+    num_cols = [1]
+    rows = reference_msp(policy, [1], num_cols)
+    return rows, num_cols[0]
+
+
+def random_policy(rng, depth):
+    r = rng.random()
+    if depth == 0 or r < 0.25:
+        return rng.choice('ABCDEFG')
+    if r < 0.4:
+        n = rng.randint(2, 4)
+        return '%d of (%s)' % (rng.randint(1, n), ', '.join(random_policy(rng, depth - 1) for _ in range(n)))
+    return '(%s %s %s)' % (random_policy(rng, depth - 1), rng.choice(['and', 'or']), random_policy(rng, depth - 1))
+
+
+class TestBuildMSP(unittest.TestCase):
+    def compile(self, policy_string):
+        util = MSP(None, verbose=False)
+        return util.convert_policy_to_msp(util.createPolicy(policy_string)), util.len_longest_row
+
+    def assertSameMSP(self, policy_string):
+        rows, num_cols = self.compile(policy_string)
+        ref_rows, ref_cols = reference_compile(policy_string)
+        self.assertEqual(list(rows.items()), list(ref_rows.items()), policy_string)
+        self.assertEqual(num_cols, ref_cols, policy_string)
+
+    def test_collapsed_gate_is_spliced(self):
+        # The repeated children of the OR gate collapse into (A and B), which belongs to the outer AND chain
+        self.assertSameMSP('A and ((A and B) or (A and B))')
+        self.assertEqual(self.compile('A and ((A and B) or (A and B))'), ({'A': [1, 1], 'B': [0, -1]}, 2))
+        self.assertSameMSP('G and 1 of ((G and (C or B)), (G and (C or B)))')
+
+    def test_random_policies(self):
+        rng = random.Random(2025)
+        for _ in range(1500):
+            self.assertSameMSP(random_policy(rng, 5))
+
+
+class TestThresholdPolicyParser(unittest.TestCase):
+    def test_trailing_text_is_rejected(self):
+        for policy_string in ['2 of (A, B', 'A and B)', '2 of (A, B, C) C', '']:
+            with self.assertRaises(ValueError, msg=policy_string):
+                MSP(None, verbose=False).createPolicy(policy_string)
+
+    def test_threshold_gate(self):
+        policy = MSP(None, verbose=False).createPolicy('2 of (A, B, C and D)')
+        self.assertEqual(policy.getNodeType(), OpType.THRESHOLD)
+        self.assertEqual(str(policy), '2 of (A, B, (C and D))')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+"""
+Tests of the multi-exponentiation methods against separate exponentiations.
+"""
+
+import unittest
+
+from charm.toolbox.pairinggroup import PairingGroup, ZR, G1, G2
+
+import multiexp
+
+GROUP = PairingGroup('BN254')
+
+
+def naive(bases, exponents):
+    result = 1
+    for base, exp in zip(bases, exponents):
+        result = result * base ** exp
+    return result
+
+
+class TestMultiexp(unittest.TestCase):
+    def check(self, bases, exponents):
+        expected = naive(bases, exponents)
+        for method in (multiexp.multiexp, multiexp.straus, multiexp.pippenger):
+            self.assertEqual(method(bases, exponents), expected, method.__name__)
+
+    def test_sizes(self):
+        for group_type in (G1, G2):
+            for n in (1, 2, 5, multiexp.PIPPENGER_THRESHOLD + 3):
+                self.check([GROUP.random(group_type) for _ in range(n)], [GROUP.random(ZR) for _ in range(n)])
+
+    def test_small_and_negative_exponents(self):
+        bases = [GROUP.random(G1) for _ in range(4)]
+        self.check(bases, [0, 1, -1, -7])
+        self.check(bases, [GROUP.random(ZR), 0, 3, -(1 << 40)])
+
+    def test_empty_product(self):
+        self.assertEqual(multiexp.multiexp([], []), 1)
+        self.assertEqual(multiexp.multiexp([GROUP.random(G1)], [0]), 1)
+
+    def test_precomputed_base(self):
+        base = GROUP.random(G1)
+        base.initPP()
+        bases, exponents = [base, GROUP.random(G1)], [GROUP.random(ZR), -5]
+        self.assertEqual(multiexp.multiexp(bases, exponents), naive(bases, exponents))
+
+
+if __name__ == '__main__':
+    unittest.main()
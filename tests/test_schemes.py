@@ -0,0 +1,122 @@
+"""
+Round-trip tests of the four ABS schemes: a signature verifies for the signed message and policy
+(or attribute set), and does not verify for another message.
+"""
+
+import unittest
+
+from charm.toolbox.pairinggroup import PairingGroup
+
+from FABS_kp import FABS_KPABS
+from FABS_sp import FABS_SPABS
+from KCGD14_sp import KCGD14
+from RD16_kp import RD16
+from transcript import FS_LEGACY, FS_TRANSCRIPT_V1
+
+GROUP = PairingGroup('BN254')
+UNIVERSE = ['1', '2', '3', '4', '5', '6']
+MSG = 'hello world'
+OTHER_MSG = 'goodbye world'
+
+AND_OR_POLICY = '(1 and 2) or (3 and 4)'
+THRESHOLD_POLICY = '2 of (1, 2, 3 and 4)'
+
+
+class SchemeRoundTrip:
+    scheme_class = None
+    # KP schemes take the policy in keygen and the attribute list in verify, SP schemes the other way around
+    key_policy = False
+    # The legacy challenge of KCGD14 leaves the message out, so only the transcript mode binds it
+    legacy_binds_message = True
+
+    def setUp(self):
+        self.scheme = self.scheme_class(GROUP)
+        self.mpk, self.msk = self.scheme.setup(8) if self.key_policy else self.scheme.setup(UNIVERSE)
+        if hasattr(self.scheme, 'precompute'):
+            self.scheme.precompute(self.mpk)
+
+    def keygen(self, policy_str, attr_list):
+        return self.scheme.keygen(self.mpk, self.msk, policy_str if self.key_policy else attr_list)
+
+    def verify(self, signature, policy_str, attr_list, msg, fs_version=FS_LEGACY):
+        verify_input = attr_list if self.key_policy else policy_str
+        return self.scheme.verify(self.mpk, signature, verify_input, msg, fs_version=fs_version)
+
+    def assertRoundTrip(self, policy_str, attr_list, fs_version=FS_LEGACY, sk=None):
+        sk = sk or self.keygen(policy_str, attr_list)
+        signature = self.scheme.sign(self.mpk, sk, MSG, policy_str, attr_list, fs_version=fs_version)
+        self.assertTrue(self.verify(signature, policy_str, attr_list, MSG, fs_version))
+        if fs_version != FS_LEGACY or self.legacy_binds_message:
+            self.assertFalse(self.verify(signature, policy_str, attr_list, OTHER_MSG, fs_version))
+        return signature
+
+    def test_and_or_policy(self):
+        self.assertRoundTrip(AND_OR_POLICY, ['1', '2'])
+        self.assertRoundTrip(AND_OR_POLICY, ['3', '4'])
+
+    def test_threshold_policy(self):
+        self.assertRoundTrip(THRESHOLD_POLICY, ['1', '3', '4'])
+        self.assertRoundTrip(THRESHOLD_POLICY, ['1', '2'])
+
+    def test_extra_attributes(self):
+        # The signer holds more attributes than the policy needs
+        self.assertRoundTrip(AND_OR_POLICY, ['1', '2', '3', '5'])
+        self.assertRoundTrip(THRESHOLD_POLICY, ['1', '2', '3', '4'])
+
+    def test_transcript_mode(self):
+        signature = self.assertRoundTrip(THRESHOLD_POLICY, ['2', '3', '4'], fs_version=FS_TRANSCRIPT_V1)
+        self.assertFalse(self.verify(signature, THRESHOLD_POLICY, ['2', '3', '4'], MSG, FS_LEGACY))
+
+    def test_unsatisfied_policy(self):
+        sk = self.keygen(AND_OR_POLICY, ['1', '3'])
+        with self.assertRaises(ValueError):
+            self.scheme.sign(self.mpk, sk, MSG, AND_OR_POLICY, ['1', '3'])
+
+    def test_offline_coupon(self):
+        if not hasattr(self.scheme, 'offline'):
+            self.skipTest("%s has no offline phase" % self.scheme.name)
+        sk = self.keygen(AND_OR_POLICY, ['1', '2'])
+        self.assertEqual(self.scheme.offline(self.mpk, sk, 2), 2)
+        self.assertRoundTrip(AND_OR_POLICY, ['1', '2'], sk=sk)
+        self.assertEqual(len(self.scheme.pools.get(sk)), 1)
+
+    def test_verify_batch(self):
+        if not hasattr(self.scheme, 'verify_batch'):
+            self.skipTest("%s has no verify_batch" % self.scheme.name)
+        sk = self.keygen(AND_OR_POLICY, ['1', '2'])
+        signature = self.scheme.sign(self.mpk, sk, MSG, AND_OR_POLICY, ['1', '2'])
+        verify_input = ['1', '2'] if self.key_policy else AND_OR_POLICY
+        malformed = dict(signature, s_i={})
+        items = [(signature, verify_input, MSG), (malformed, verify_input, MSG), (signature, verify_input, OTHER_MSG)]
+        self.assertEqual(self.scheme.verify_batch(self.mpk, items), [True, False, False])
+
+
+class TestFABSKPABS(SchemeRoundTrip, unittest.TestCase):
+    scheme_class = FABS_KPABS
+    key_policy = True
+
+
+class TestFABSSPABS(SchemeRoundTrip, unittest.TestCase):
+    scheme_class = FABS_SPABS
+
+
+class TestRD16(SchemeRoundTrip, unittest.TestCase):
+    scheme_class = RD16
+    key_policy = True
+
+
+class TestKCGD14(SchemeRoundTrip, unittest.TestCase):
+    scheme_class = KCGD14
+    legacy_binds_message = False
+
+    def test_lazy_keys(self):
+        self.mpk, self.msk = self.scheme.setup(lazy=True)
+        sk = self.keygen(THRESHOLD_POLICY, ['1', '3', '4'])
+        with self.assertRaises(ValueError):
+            self.scheme.sign(self.mpk, sk, MSG, THRESHOLD_POLICY, ['1', '3', '4'])
+        self.scheme.publish(self.mpk, self.msk, ['2'])
+        self.assertRoundTrip(THRESHOLD_POLICY, ['1', '3', '4'], sk=sk)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+"""
+Tests of the Fiat-Shamir transcripts: determinism and domain separation.
+"""
+
+import unittest
+
+from charm.toolbox.pairinggroup import PairingGroup, G1
+
+from transcript import FS_LEGACY, FS_TRANSCRIPT_V1, Transcript, check_version
+
+GROUP = PairingGroup('BN254')
+
+
+def challenge(*values, protocol='test'):
+    transcript = Transcript(GROUP, protocol)
+    for label, value in values:
+        transcript.absorb(label, value)
+    return transcript.challenge()
+
+
+class TestTranscript(unittest.TestCase):
+    def test_deterministic(self):
+        elem = GROUP.random(G1)
+        self.assertEqual(challenge(('x', elem), ('msg', 'm')), challenge(('x', elem), ('msg', 'm')))
+
+    def test_dictionaries_in_sorted_key_order(self):
+        elem = GROUP.random(G1)
+        self.assertEqual(challenge(('d', {'b': elem, 'a': 1, 0: 'x'})), challenge(('d', {0: 'x', 'a': 1, 'b': elem})))
+
+    def test_domain_separation(self):
+        base = challenge(('x', 'value'))
+        self.assertNotEqual(base, challenge(('x', 'value'), protocol='other'))
+        self.assertNotEqual(base, challenge(('y', 'value')))
+        self.assertNotEqual(challenge(('x', 'ab'), ('y', 'c')), challenge(('x', 'a'), ('y', 'bc')))
+
+    def test_value_types(self):
+        # The same text as an integer, a string and bytes gives three different challenges
+        self.assertEqual(len({challenge(('x', 5)), challenge(('x', '5')), challenge(('x', b'5'))}), 3)
+        self.assertNotEqual(challenge(('x', [1, 2])), challenge(('x', {1: 2})))
+
+    def test_challenge_keeps_state(self):
+        transcript = Transcript(GROUP, 'test').absorb('x', 1)
+        first = transcript.challenge()
+        self.assertEqual(first, transcript.challenge())
+        self.assertNotEqual(first, transcript.absorb('y', 2).challenge())
+
+    def test_check_version(self):
+        check_version(FS_LEGACY)
+        check_version(FS_TRANSCRIPT_V1)
+        with self.assertRaises(AssertionError):
+            check_version(99)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+"""
+Tests of the wire format: round trips, lazy decoding and malformed input.
+"""
+
+import unittest
+
+from charm.toolbox.pairinggroup import PairingGroup, ZR, G1, G2, GT
+
+import wire
+
+GROUP = PairingGroup('BN254')
+
+
+class TestWire(unittest.TestCase):
+    def setUp(self):
+        g1, g2 = GROUP.random(G1), GROUP.random(G2)
+        self.obj = {
+            'g1': g1, 'g2': g2, 'gt': GROUP.random(GT),
+            'z': GROUP.random(ZR), 'n': -300, 'big': 1 << 70, 'name': 'policy é', 'none': None, 'flags': [True, False],
+            'attrs': {'A': GROUP.random(G1), 'B_1': GROUP.random(G1)}, 'columns': {0: [1, -1], 1: []},
+        }
+
+    def test_round_trip(self):
+        data = wire.encode(GROUP, self.obj)
+        self.assertEqual(data[:len(wire.MAGIC)], wire.MAGIC)
+        self.assertEqual(wire.decode(GROUP, data, lazy=False), self.obj)
+        self.assertEqual(wire.materialize(wire.decode(GROUP, data)), self.obj)
+
+    def test_lazy_decode(self):
+        decoded = wire.decode(GROUP, wire.encode(GROUP, self.obj))
+        self.assertIsInstance(decoded, wire.LazyDict)
+        self.assertEqual(sorted(decoded), sorted(self.obj))
+        self.assertIn('attrs', decoded)
+        self.assertEqual(decoded['attrs']['B_1'], self.obj['attrs']['B_1'])
+        # A decoded value is kept, so repeated lookups return the same object
+        self.assertIs(decoded['g1'], decoded['g1'])
+
+    def test_invalid_input(self):
+        data = wire.encode(GROUP, {'a': 1})
+        with self.assertRaises(ValueError):
+            wire.decode(GROUP, b'XXXX' + data[4:])
+        with self.assertRaises(ValueError):
+            wire.decode(GROUP, data[:4] + bytes([wire.VERSION + 1]) + data[5:])
+        with self.assertRaises(ValueError):
+            wire.decode(GROUP, data + b'\x00')
+        with self.assertRaises(TypeError):
+            wire.encode(GROUP, {'a': 1.5})
+        with self.assertRaises(TypeError):
+            wire.encode(GROUP, {True: 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
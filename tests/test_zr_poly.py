@@ -0,0 +1,51 @@
+"""
+Tests of the polynomials over ZR used by RD16.
+"""
+
+import unittest
+
+from charm.toolbox.pairinggroup import PairingGroup, ZR
+
+import zr_poly
+
+GROUP = PairingGroup('BN254')
+
+
+def value_at(coeffs, x):
+    powers = zr_poly.powers(GROUP, x, len(coeffs))
+    result = GROUP.init(ZR, 0)
+    for coeff, power in zip(coeffs, powers):
+        result += coeff * power
+    return result
+
+
+class TestZRPoly(unittest.TestCase):
+    def test_from_roots(self):
+        roots = [GROUP.random(ZR) for _ in range(4)]
+        coeffs = zr_poly.from_roots(GROUP, roots)
+        self.assertEqual(len(coeffs), 5)
+        self.assertEqual(coeffs[-1], GROUP.init(ZR, 1))
+        for root in roots:
+            self.assertEqual(value_at(coeffs, root), GROUP.init(ZR, 0))
+        self.assertNotEqual(value_at(coeffs, GROUP.random(ZR)), GROUP.init(ZR, 0))
+
+    def test_small_polynomial(self):
+        # (X - 2)(X - 3) = 6 - 5X + X^2
+        coeffs = zr_poly.from_roots(GROUP, [GROUP.init(ZR, 2), GROUP.init(ZR, 3)])
+        self.assertEqual(coeffs, [GROUP.init(ZR, 6), GROUP.init(ZR, 0) - GROUP.init(ZR, 5), GROUP.init(ZR, 1)])
+
+    def test_padding(self):
+        coeffs = zr_poly.from_roots(GROUP, [GROUP.random(ZR)], length=4)
+        self.assertEqual(len(coeffs), 4)
+        self.assertEqual(coeffs[2:], [GROUP.init(ZR, 0)] * 2)
+        with self.assertRaises(ValueError):
+            zr_poly.from_roots(GROUP, [GROUP.random(ZR) for _ in range(4)], length=4)
+
+    def test_powers(self):
+        x = GROUP.random(ZR)
+        self.assertEqual(zr_poly.powers(GROUP, x, 0), [])
+        self.assertEqual(zr_poly.powers(GROUP, x, 4), [GROUP.init(ZR, 1), x, x * x, x * x * x])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,249 @@
+"""
+asyncio signature verification service with adaptive micro-batching.
+Clients send length-prefixed frames (4-byte big-endian length, then a wire-encoded dictionary):
+- request: {'id': int, 'scheme': name, 'signature': dict, 'attrs': attr_list or policy_str, 'msg': str,
+    'fs_version': int (optional)};
+- response: {'id': int, 'result': bool} or {'id': int, 'error': str}.
+Requests of all connections go through one bounded queue; when it is full the connection handlers
+stop reading from their sockets, so bursts are pushed back to the clients instead of growing memory.
+A dispatcher collects requests for a short time window, groups them by scheme, policy and
+Fiat-Shamir mode, and verifies every group in one call: the scheme's verify_batch when it has one,
+ParallelABS.verify_many when the scheme is served by a process pool, one verify per request otherwise.
+If the call of a group raises, its requests are verified one by one, so an error is only reported
+to the request that caused it.
+The window adapts to the load: it grows towards max_delay while batches fill up and shrinks
+towards min_delay when requests arrive one at a time, so a lone request is not held back.
+It provides the following classes:
+- VerificationService: the server, listening on a Unix socket or a loopback TCP port;
+- VerificationClient: a client issuing pipelined requests over one connection.
+"""
+
+import asyncio
+import itertools
+import struct
+
+import wire
+from parallel import ParallelABS
+from transcript import FS_LEGACY
+
+_LENGTH = struct.Struct('>I')
+MAX_FRAME = 1 << 24
+
+
+async def _read_frame(reader):
+    header = await reader.readexactly(_LENGTH.size)
+    (length,) = _LENGTH.unpack(header)
+    if length > MAX_FRAME:
+        raise ValueError("frame of %d bytes exceeds the limit" % length)
+    return await reader.readexactly(length)
+
+
+def _write_frame(writer, payload):
+    writer.write(_LENGTH.pack(len(payload)) + payload)
+
+
+class VerificationService:
+    """
+    verifiers maps a scheme name to either a (scheme, mpk) pair or a ParallelABS instance.
+    """
+
+    def __init__(self, group, verifiers, max_queue=1024, max_batch=64, min_delay=0.0005, max_delay=0.005):
+        assert max_queue > 0 and max_batch > 0, "queue and batch sizes must be positive"
+        self.group = group
+        self.verifiers = verifiers
+        self.max_batch = max_batch
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.delay = min_delay
+        self.max_queue = max_queue
+        self._queue = None
+        self._dispatcher = None
+        self._servers = []
+
+    async def _ensure_dispatcher(self):
+        if self._dispatcher is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._dispatcher = asyncio.get_running_loop().create_task(self._dispatch())
+
+    async def start_unix(self, path):
+        await self._ensure_dispatcher()
+        server = await asyncio.start_unix_server(self._handle, path=path)
+        self._servers.append(server)
+        return server
+
+    async def start_tcp(self, host='127.0.0.1', port=0):
+        await self._ensure_dispatcher()
+        server = await asyncio.start_server(self._handle, host=host, port=port)
+        self._servers.append(server)
+        return server
+
+    async def close(self):
+        for server in self._servers:
+            server.close()
+            await server.wait_closed()
+        self._servers = []
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            try:
+                await self._dispatcher
+            except asyncio.CancelledError:
+                pass
+            self._dispatcher = None
+
+    async def _handle(self, reader, writer):
+        pending = set()
+        try:
+            while True:
+                try:
+                    frame = await _read_frame(reader)
+                except asyncio.IncompleteReadError:
+                    break
+                request_id = None
+                try:
+                    request = wire.decode(self.group, frame)
+                    request_id = request['id']
+                    if request['scheme'] not in self.verifiers:
+                        raise KeyError("unknown scheme %r" % request['scheme'])
+                    attrs = request['attrs']
+                    key = (request['scheme'], attrs if isinstance(attrs, str) else tuple(attrs), request.get('fs_version', FS_LEGACY))
+                    item = (request['signature'], attrs, request['msg'])
+                except Exception as err:
+                    _write_frame(writer, wire.encode(self.group, {'id': request_id, 'error': str(err)}))
+                    continue
+
+                # Blocks while the queue is full, which stops reading from this client (backpressure)
+                future = asyncio.get_running_loop().create_future()
+                await self._queue.put((key, item, future))
+                task = asyncio.ensure_future(self._respond(writer, request_id, future))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+            if pending:
+                await asyncio.gather(*pending)
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, request_id, future):
+        try:
+            response = {'id': request_id, 'result': bool(await future)}
+        except Exception as err:
+            response = {'id': request_id, 'error': str(err)}
+        _write_frame(writer, wire.encode(self.group, response))
+        await writer.drain()
+
+    async def _collect(self):
+        # Wait for one request, then gather more until the batch is full or the window closes
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.delay
+        while len(batch) < self.max_batch:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    def _adapt(self, batch_size):
+        if batch_size >= self.max_batch:
+            self.delay = min(self.max_delay, self.delay * 2)
+        elif batch_size == 1:
+            self.delay = max(self.min_delay, self.delay / 2)
+
+    def _verify_group(self, scheme_name, fs_version, items):
+        verifier = self.verifiers[scheme_name]
+        if isinstance(verifier, ParallelABS):
+            return verifier.verify_many(items, fs_version=fs_version)
+        scheme, mpk = verifier
+        if hasattr(scheme, 'verify_batch'):
+            return scheme.verify_batch(mpk, items, fs_version=fs_version)
+        return [scheme.verify(mpk, signature, attrs, msg, fs_version=fs_version) for signature, attrs, msg in items]
+
+    def _verify_batch(self, batch):
+        groups = {}
+        for key, item, future in batch:
+            groups.setdefault(key, []).append((item, future))
+
+        outcomes = []
+        for (scheme_name, _, fs_version), entries in groups.items():
+            futures = [future for _, future in entries]
+            try:
+                results = self._verify_group(scheme_name, fs_version, [item for item, _ in entries])
+                outcomes += [(future, result, None) for future, result in zip(futures, results)]
+            except Exception as err:
+                if len(entries) == 1:
+                    outcomes.append((futures[0], None, err))
+                    continue
+                # One bad request (e.g., a malformed signature) must not fail the others of its group:
+                # verify every request on its own, so the error only reaches the request that caused it
+                for item, future in entries:
+                    try:
+                        outcomes.append((future, self._verify_group(scheme_name, fs_version, [item])[0], None))
+                    except Exception as item_err:
+                        outcomes.append((future, None, item_err))
+        return outcomes
+
+    async def _dispatch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            self._adapt(len(batch))
+            # Verification runs off the event loop so connections keep being served meanwhile
+            outcomes = await loop.run_in_executor(None, self._verify_batch, batch)
+            for future, result, err in outcomes:
+                if future.done():
+                    continue
+                if err is not None:
+                    future.set_exception(err)
+                else:
+                    future.set_result(result)
+
+
+class VerificationClient:
+    def __init__(self, group, reader, writer):
+        self.group = group
+        self._reader = reader
+        self._writer = writer
+        self._ids = itertools.count()
+        self._waiting = {}
+        self._receiver = asyncio.get_running_loop().create_task(self._receive())
+
+    @classmethod
+    async def connect_unix(cls, group, path):
+        reader, writer = await asyncio.open_unix_connection(path)
+        return cls(group, reader, writer)
+
+    @classmethod
+    async def connect_tcp(cls, group, host, port):
+        reader, writer = await asyncio.open_connection(host, port)
+        return cls(group, reader, writer)
+
+    async def _receive(self):
+        try:
+            while True:
+                response = wire.decode(self.group, await _read_frame(self._reader))
+                future = self._waiting.pop(response['id'], None)
+                if future is None:
+                    continue
+                if 'error' in response:
+                    future.set_exception(ValueError(response['error']))
+                else:
+                    future.set_result(response['result'])
+        except (asyncio.IncompleteReadError, ConnectionError):
+            for future in self._waiting.values():
+                future.set_exception(ConnectionError("verification service closed the connection"))
+            self._waiting.clear()
+
+    async def verify(self, scheme_name, signature, attrs, msg, fs_version=FS_LEGACY):
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._waiting[request_id] = future
+        request = {'id': request_id, 'scheme': scheme_name, 'signature': signature, 'attrs': attrs, 'msg': msg, 'fs_version': fs_version}
+        _write_frame(self._writer, wire.encode(self.group, request))
+        await self._writer.drain()
+        return await future
+
+    async def close(self):
+        self._receiver.cancel()
+        self._writer.close()
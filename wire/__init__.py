@@ -0,0 +1,239 @@
+"""
+Compact binary wire format for the keys and signatures of the ABS schemes.
+The mpk, sk and signature of every scheme are (nested) dictionaries of group elements, integers,
+strings, lists and dictionaries keyed by attributes or indices; all of them are encoded as follows:
+- header: the magic bytes b'ABSW' followed by the format version (1 byte);
+- group element: a type byte (ZR, G1, G2, GT) and the length-prefixed element bytes,
+    with G1 and G2 points in compressed form;
+- integer: zigzag varint; string: length-prefixed UTF-8;
+- list: the byte length of its body, the number of items, then the items;
+- dictionary (e.g., an attribute table): the byte length of its body, the number of entries,
+    then every key (string or integer) followed by its value.
+All lengths are unsigned LEB128 varints. Since every container carries its byte length, a
+decoder can skip over entries it does not need.
+It provides the following functions:
+- encode: encode a key or signature into bytes;
+- decode: decode bytes (or a memoryview) back; by default dictionaries are decoded lazily, i.e.,
+    only the entry offsets are read upfront and each value is decoded on first access;
+- materialize: turn a lazily decoded object into plain dictionaries and lists.
+Decoded elements carry no fixed-base tables; run the scheme's precompute again on a decoded mpk.
+"""
+
+from base64 import b64decode, b64encode
+from collections.abc import Mapping
+
+from charm.toolbox.pairinggroup import pc_element
+
+MAGIC = b'ABSW'
+VERSION = 1
+
+# Value tags; the element tags 0-3 are the charm group types ZR, G1, G2 and GT
+TAG_INT = 4
+TAG_STR = 5
+TAG_LIST = 6
+TAG_DICT = 7
+TAG_NONE = 8
+TAG_TRUE = 9
+TAG_FALSE = 10
+ELEMENT_TAGS = (0, 1, 2, 3)
+
+
+def _write_varint(out, n):
+    while n > 0x7f:
+        out.append((n & 0x7f) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _read_varint(buf, pos):
+    n, shift = 0, 0
+    while True:
+        if pos >= len(buf):
+            raise ValueError("truncated varint")
+        byte = buf[pos]
+        pos += 1
+        n |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return n, pos
+        shift += 7
+
+
+def is_element(value):
+    # Elements of an instrumented group (see instrument) keep the charm element in .element
+    return isinstance(getattr(value, 'element', value), pc_element)
+
+
+def _element_bytes(group, elem):
+    # charm serializes an element as b'<type>:' followed by the base64 of its raw encoding
+    elem_type, data = group.serialize(elem, compression=True).split(b':', 1)
+    return int(elem_type), b64decode(data)
+
+
+def _encode_value(group, value, out):
+    if is_element(value):
+        elem_type, raw = _element_bytes(group, value)
+        out.append(elem_type)
+        _write_varint(out, len(raw))
+        out += raw
+    elif value is None:
+        out.append(TAG_NONE)
+    elif value is True or value is False:
+        out.append(TAG_TRUE if value else TAG_FALSE)
+    elif isinstance(value, int):
+        out.append(TAG_INT)
+        _write_varint(out, value << 1 if value >= 0 else ((-value) << 1) - 1)
+    elif isinstance(value, str):
+        raw = value.encode('utf-8')
+        out.append(TAG_STR)
+        _write_varint(out, len(raw))
+        out += raw
+    elif isinstance(value, (list, tuple)):
+        body = bytearray()
+        _write_varint(body, len(value))
+        for item in value:
+            _encode_value(group, item, body)
+        out.append(TAG_LIST)
+        _write_varint(out, len(body))
+        out += body
+    elif isinstance(value, Mapping):
+        body = bytearray()
+        _write_varint(body, len(value))
+        for key, item in value.items():
+            if not isinstance(key, (int, str)) or isinstance(key, bool):
+                raise TypeError("dictionary keys must be strings or integers, got %s" % type(key).__name__)
+            _encode_value(group, key, body)
+            _encode_value(group, item, body)
+        out.append(TAG_DICT)
+        _write_varint(out, len(body))
+        out += body
+    else:
+        raise TypeError("cannot encode a value of type %s" % type(value).__name__)
+
+
+def encode(group, obj):
+    """
+    Encode an mpk, sk or signature (any nesting of the supported values) into bytes.
+    """
+
+    out = bytearray(MAGIC)
+    out.append(VERSION)
+    _encode_value(group, obj, out)
+    return bytes(out)
+
+
+def _skip_value(buf, pos):
+    tag = buf[pos]
+    pos += 1
+    if tag in ELEMENT_TAGS or tag in (TAG_STR, TAG_LIST, TAG_DICT):
+        length, pos = _read_varint(buf, pos)
+        return pos + length
+    if tag == TAG_INT:
+        return _read_varint(buf, pos)[1]
+    if tag in (TAG_NONE, TAG_TRUE, TAG_FALSE):
+        return pos
+    raise ValueError("unknown tag %d at offset %d" % (tag, pos - 1))
+
+
+def _decode_value(group, buf, pos, lazy):
+    # Return the value starting at pos and the offset right after it
+    tag = buf[pos]
+    pos += 1
+    if tag in ELEMENT_TAGS:
+        length, pos = _read_varint(buf, pos)
+        end = pos + length
+        elem = group.deserialize(b'%d:' % tag + b64encode(buf[pos:end]), compression=True)
+        return elem, end
+    if tag == TAG_INT:
+        n, pos = _read_varint(buf, pos)
+        return (n >> 1) if not n & 1 else -((n + 1) >> 1), pos
+    if tag == TAG_STR:
+        length, pos = _read_varint(buf, pos)
+        return bytes(buf[pos:pos + length]).decode('utf-8'), pos + length
+    if tag == TAG_LIST:
+        length, pos = _read_varint(buf, pos)
+        end = pos + length
+        count, pos = _read_varint(buf, pos)
+        items = []
+        for _ in range(count):
+            item, pos = _decode_value(group, buf, pos, lazy)
+            items.append(item)
+        return items, end
+    if tag == TAG_DICT:
+        length, pos = _read_varint(buf, pos)
+        end = pos + length
+        if lazy:
+            return LazyDict(group, buf, pos), end
+        count, pos = _read_varint(buf, pos)
+        entries = {}
+        for _ in range(count):
+            key, pos = _decode_value(group, buf, pos, lazy)
+            entries[key], pos = _decode_value(group, buf, pos, lazy)
+        return entries, end
+    if tag == TAG_NONE:
+        return None, pos
+    if tag in (TAG_TRUE, TAG_FALSE):
+        return tag == TAG_TRUE, pos
+    raise ValueError("unknown tag %d at offset %d" % (tag, pos - 1))
+
+
+class LazyDict(Mapping):
+    """
+    Read-only dictionary backed by the encoded bytes.
+    Keys and value offsets are read when the dictionary is created; a value is decoded on its
+    first access and kept, so repeated lookups return the same object.
+    """
+
+    def __init__(self, group, buf, pos):
+        self._group = group
+        self._buf = buf
+        self._offsets = {}
+        self._values = {}
+        count, pos = _read_varint(buf, pos)
+        for _ in range(count):
+            key, pos = _decode_value(group, buf, pos, False)
+            self._offsets[key] = pos
+            pos = _skip_value(buf, pos)
+
+    def __getitem__(self, key):
+        try:
+            return self._values[key]
+        except KeyError:
+            value = _decode_value(self._group, self._buf, self._offsets[key], True)[0]
+            self._values[key] = value
+            return value
+
+    def __iter__(self):
+        return iter(self._offsets)
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __contains__(self, key):
+        return key in self._offsets
+
+    def __repr__(self):
+        return repr(materialize(self))
+
+
+def decode(group, data, lazy=True):
+    """
+    Decode the bytes produced by encode. data may be bytes, a bytearray or a memoryview, and is not copied.
+    """
+
+    buf = memoryview(data)
+    if bytes(buf[:len(MAGIC)]) != MAGIC:
+        raise ValueError("not an encoded ABS object")
+    if buf[len(MAGIC)] != VERSION:
+        raise ValueError("unsupported wire format version %d" % buf[len(MAGIC)])
+    value, end = _decode_value(group, buf, len(MAGIC) + 1, lazy)
+    if end != len(buf):
+        raise ValueError("trailing bytes after the encoded object")
+    return value
+
+
+def materialize(obj):
+    if isinstance(obj, Mapping):
+        return {key: materialize(value) for key, value in obj.items()}
+    if isinstance(obj, list):
+        return [materialize(item) for item in obj]
+    return obj
@@ -0,0 +1,44 @@
+"""
+Polynomials over ZR, for the attribute-root polynomials of RD16.
+A polynomial is the list of its coefficients in ascending order of degree (y[0] + y[1] X + ...),
+and all the arithmetic is done with ZR elements, so the coefficients are exact.
+It provides the following functions:
+- from_roots: the coefficients of prod_i (X - roots[i]), optionally padded with zeroes, using
+    one multiplication and one subtraction per coefficient and root (O(m^2) for m roots);
+- powers: the table [x^0, x^1, ..., x^(count-1)], one multiplication per entry.
+"""
+
+from charm.toolbox.pairinggroup import ZR
+
+
+def from_roots(group, roots, length=None):
+    """
+    Return the coefficients of the monic polynomial whose roots are roots (with multiplicity), in
+    ascending order. If length is given, the list is padded with zeroes up to length coefficients;
+    a polynomial with more coefficients than length raises a ValueError.
+    """
+
+    coeffs = [group.init(ZR, 1)]
+    for root in roots:
+        # Multiply by (X - root): the new coefficient of X^i is y[i-1] - root * y[i]
+        coeffs.append(coeffs[-1])
+        for i in range(len(coeffs) - 2, 0, -1):
+            coeffs[i] = coeffs[i - 1] - root * coeffs[i]
+        coeffs[0] = 0 - root * coeffs[0]
+
+    if length is not None:
+        if len(coeffs) > length:
+            raise ValueError("a polynomial with %d roots needs %d coefficients, only %d are available" % (len(roots), len(coeffs), length))
+        coeffs += [group.init(ZR, 0)] * (length - len(coeffs))
+    return coeffs
+
+
+def powers(group, x, count):
+    """
+    Return [x^0, x^1, ..., x^(count-1)], each power computed from the previous one.
+    """
+
+    table = [group.init(ZR, 1)] if count > 0 else []
+    for _ in range(1, count):
+        table.append(table[-1] * x)
+    return table